@@ -0,0 +1,239 @@
+import hashlib
+import io
+import os
+import posixpath
+import zlib
+from ftplib import error_perm
+from urllib.parse import urljoin, urlsplit
+
+from ftp_pool import FTP_BLOCK_SIZE, connection_lost
+from metrics import current
+from retry import FTP_RETRY
+
+# ============================================================
+# Content-Addressed PDF Archive
+# ============================================================
+# Every distinct PDF is uploaded exactly once, named after its
+# SHA-256, into a folder shared by all leagues:
+#
+#     league_pdfs/objects/3f/3f9c...e1.pdf
+#
+# The names people actually follow are tiny HTML redirects that
+# point at that object:
+#
+#     league_pdfs/weds-mixers/standings_2025-01-15.html
+#     league_pdfs/weds-mixers/latest.html
+#
+# plus manifest.json (see manifest.py), which also records the
+# object path. A re-run on the same day, or the same standings
+# being posted again on a later day (or by another league), only
+# rewrites a few hundred bytes of pointers.
+#
+# Everything is uploaded under a temp name and renamed into
+# place, so nobody ever reads a half-written file, and retried
+# (see retry.py) if the transfer fails. The same layout is used
+# on every publish target (publishers.py); put_atomic() is the
+# FTP way of writing a file.
+#
+# On FTP, a retry carries on from however much of the temp file
+# made it to the server (REST+STOR, or APPE if the server has no
+# REST STREAM) rather than starting again from byte 0, so a flaky
+# link costs a reconnect, not another full transfer. Before the
+# rename the temp file is checked: SIZE always, plus HASH
+# (SHA-256) or XCRC when the server offers them. A mismatch
+# throws the temp file away and the retry starts clean. A temp
+# file left by an earlier run is only resumed if a hash can
+# prove the result.
+#
+# Public links to .../<league>/latest.pdf predate the pointers.
+# FTP_LATEST_PDF says how they keep working:
+#
+#   redirect  (default) a few-line .htaccess in the league folder
+#             redirects latest.pdf to the current object, and the
+#             old full copy is deleted so it can't go stale. The
+#             PDF is still only uploaded once. Needs a web server
+#             that reads .htaccess (Apache, LiteSpeed); elsewhere
+#             latest.pdf links get a 404 instead.
+#   copy      also upload a full latest.pdf every time: works on
+#             any server, but sends each new PDF twice
+#   off       leave latest.pdf alone (nothing links to it)
+# ============================================================
+
+OBJECTS_DIR = os.getenv('FTP_OBJECTS_DIR', 'league_pdfs/objects')
+LATEST_PDF = os.getenv('FTP_LATEST_PDF', 'redirect')
+LATEST_PDF = {'1': 'copy', '0': 'off'}.get(LATEST_PDF, LATEST_PDF)  # the old on/off values
+if LATEST_PDF not in ('redirect', 'copy', 'off'):
+    raise ValueError(f"FTP_LATEST_PDF must be redirect, copy or off, not '{LATEST_PDF}'")
+
+REDIRECT_TEMPLATE = """# Written by the standings scraper on every new PDF (see archive.py)
+Redirect 302 {path} {target}
+"""
+
+POINTER_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<meta http-equiv="refresh" content="0; url={target}">
+<link rel="canonical" href="{target}">
+<title>{title}</title>
+</head>
+<body><a href="{target}">{title}</a></body>
+</html>
+"""
+
+
+def object_path(sha256):
+    return posixpath.join(OBJECTS_DIR, sha256[:2], f'{sha256}.pdf')
+
+
+def _remote_size(ftp, name):
+    try:
+        ftp.voidcmd('TYPE I')  # some servers refuse SIZE in ASCII mode
+        return ftp.size(name)
+    except error_perm:
+        return None
+
+
+def _hash_check(ftp):
+    # The strongest checksum the server will compute for us, if any
+    for feature in ftp.features():
+        words = feature.split()
+        if words[0] == 'HASH' and len(words) > 1 and 'SHA-256' in words[1].replace('*', '').split(';'):
+            return 'sha256'
+    return 'crc32' if ftp.has_feature('XCRC') else None
+
+
+def _checksum(fileobj, start, kind):
+    digest = hashlib.sha256() if kind == 'sha256' else None
+    crc = 0
+    fileobj.seek(start)
+    for chunk in iter(lambda: fileobj.read(FTP_BLOCK_SIZE), b''):
+        if digest:
+            digest.update(chunk)
+        else:
+            crc = zlib.crc32(chunk, crc)
+    return digest.hexdigest() if digest else crc
+
+
+def _remote_checksum(ftp, name, kind):
+    # None if the server advertised it but won't actually do it
+    try:
+        if kind == 'sha256':
+            if not any(feature.startswith('HASH SHA-256*') for feature in ftp.features()):
+                ftp.sendcmd('OPTS HASH SHA-256')
+            return ftp.sendcmd(f'HASH {name}').split()[3].lower()
+        reply = ftp.sendcmd(f'XCRC {name}').split()[1]
+        return int(reply[2:] if reply.lower().startswith('0x') else reply, 16)
+    except (error_perm, IndexError, ValueError) as e:
+        print(f"Server couldn't {kind} {name}, going by SIZE alone: {e}")
+        return None
+
+
+def _send(ftp, part, fileobj, offset):
+    if not offset:
+        ftp.storbinary(f'STOR {part}', fileobj, FTP_BLOCK_SIZE)
+    elif ftp.has_feature('REST'):
+        ftp.storbinary(f'STOR {part}', fileobj, FTP_BLOCK_SIZE, rest=offset)
+    else:
+        ftp.storbinary(f'APPE {part}', fileobj, FTP_BLOCK_SIZE)
+
+
+def put_atomic(ftp, name, fileobj, sha256=None):
+    # Upload to a temp name, check it, then swap it in with a server-side
+    # rename. Retries resume the temp file instead of starting over. With
+    # `sha256`, nothing is sent unless the bytes we have match it.
+    part = f'.{name}.part'
+    start = fileobj.tell()
+    total = fileobj.seek(0, os.SEEK_END) - start
+    if sha256 is not None and _checksum(fileobj, start, 'sha256') != sha256:
+        raise OSError(f"{name}: the local copy doesn't match sha256 {sha256[:12]}, not sending it")
+    kind = _hash_check(ftp)
+    expected = _checksum(fileobj, start, kind) if kind else None
+    ours = [False]  # has this call written to the temp file yet?
+
+    def discard_part():
+        ours[0] = False
+        try:
+            ftp.delete(part)
+        except error_perm:
+            pass
+
+    def attempt():
+        offset = _remote_size(ftp, part) if ours[0] or kind else None
+        offset = offset if offset and offset <= total else 0
+        ours[0] = True
+        if offset:
+            print(f"Resuming {name} at byte {offset} of {total}")
+            current().add('resumed_bytes', offset)
+        if not offset or offset < total:
+            fileobj.seek(start + offset)
+            _send(ftp, part, fileobj, offset)
+
+        size = _remote_size(ftp, part)
+        if size is not None and size != total:
+            discard_part()
+            raise OSError(f"{name}: server has {size} bytes, sent {total}")
+        checksum = _remote_checksum(ftp, part, kind) if kind else None
+        if checksum is not None and checksum != expected:
+            discard_part()
+            raise OSError(f"{name}: {kind} on the server doesn't match what was sent")
+
+        try:
+            ftp.rename(part, name)
+        except error_perm:
+            # Some servers won't rename over an existing file
+            ftp.delete(name)
+            ftp.rename(part, name)
+
+    def reconnect(error):
+        if connection_lost(error):
+            ftp.revive()
+    FTP_RETRY.call(attempt, on_retry=reconnect, what=f"FTP upload of {name}")
+
+
+def ensure_object(target, stored, upload):
+    # Make sure the PDF exists under its hash on `target` (a publisher
+    # session, see publishers.py); returns the object path.
+    # `upload(target, path, stored)` does the actual transfer, and
+    # checks it before the file goes live.
+    path = object_path(stored.sha256)
+    if target.size(path) == stored.size:
+        print(f"Archive already has {posixpath.basename(path)}, not uploading it again.")
+    else:
+        upload(target, path, stored)
+    return path
+
+
+def write_pointer(target, path, object_path, title):
+    relative = posixpath.relpath(object_path, posixpath.dirname(path))
+    html = POINTER_TEMPLATE.format(target=relative, title=title)
+    target.write(path, io.BytesIO(html.encode('utf-8')))
+    print(f"Pointed {path} at {relative}")
+
+
+def publish_dated(target, stored, league_dir, dated_name, upload, title='League Standings'):
+    # Archive the PDF and point the day's name at it. Returns the object
+    # path relative to the league folder.
+    path = ensure_object(target, stored, upload)
+    write_pointer(target, posixpath.join(league_dir, dated_name), path, title)
+    return posixpath.relpath(path, league_dir)
+
+
+def write_redirect(target, league_dir, relative, league_url):
+    # latest.pdf → the object, by way of the league folder's .htaccess.
+    # `league_url` is the folder's public URL (ending in /).
+    latest_url = urljoin(league_url, 'latest.pdf')
+    htaccess = REDIRECT_TEMPLATE.format(path=urlsplit(latest_url).path, target=urljoin(league_url, relative))
+    target.write(posixpath.join(league_dir, '.htaccess'), io.BytesIO(htaccess.encode('utf-8')))
+    target.delete(posixpath.join(league_dir, 'latest.pdf'))
+    print(f"Redirected {posixpath.join(league_dir, 'latest.pdf')} to {relative}")
+
+
+def publish_latest(target, stored, league_dir, relative, upload, league_url, title='League Standings'):
+    # Repoint latest at an object publish_dated() already put in place
+    path = posixpath.normpath(posixpath.join(league_dir, relative))
+    write_pointer(target, posixpath.join(league_dir, 'latest.html'), path, title)
+    if LATEST_PDF == 'redirect':
+        write_redirect(target, league_dir, relative, league_url)
+    elif LATEST_PDF == 'copy':
+        upload(target, posixpath.join(league_dir, 'latest.pdf'), stored)
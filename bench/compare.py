@@ -0,0 +1,121 @@
+import argparse
+import json
+import os
+import sys
+
+# ============================================================
+# Benchmark Regression Check
+# ============================================================
+# Compares a bench/run.py result with an earlier one (in CI, the
+# last run on the default branch) and fails if something got
+# worse:
+#
+#     python bench/compare.py baseline.json bench-results.json
+#
+# Per scenario it checks:
+#
+#   time     the scenario's wall time and every stage's total,
+#            allowed MAX_SLOWDOWN times the baseline plus
+#            MIN_SECONDS (timings on shared runners are noisy)
+#   traffic  PDF bytes downloaded, bytes and commands sent to
+#            FTP: these don't depend on the runner, so they may
+#            only grow by MAX_GROWTH. Skipped when the runs
+#            inject failures, which makes them vary, and for the
+#            crash scenarios, which depend on when the kill hit.
+#
+# Runs with a different configuration (leagues, PDF size, ...)
+# aren't comparable; that's reported and the check passes. The
+# table also goes to the job summary when GITHUB_STEP_SUMMARY
+# is set.
+# ============================================================
+
+MAX_SLOWDOWN = float(os.getenv('BENCH_MAX_SLOWDOWN', 1.5))
+MIN_SECONDS = float(os.getenv('BENCH_MIN_SECONDS', 0.5))
+MAX_GROWTH = float(os.getenv('BENCH_MAX_GROWTH', 1.1))
+
+COMPARED_CONFIG = ('leagues', 'pdf_kb', 'latency_ms', 'fail_rate', 'host_rate', 'targets')
+TRAFFIC = [('http', 'pdf_bytes'), ('ftp', 'bytes_received'), ('ftp', 'commands')]
+VARIABLE_TRAFFIC = {'crashed', 'resumed'}
+
+
+def load(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def timings(scenario):
+    yield 'wall', scenario['wall_seconds']
+    for stage, entry in scenario['stages'].items():
+        yield f'stage {stage}', entry['total']
+
+
+def compare(baseline, current):
+    # [(scenario, metric, before, after, regressed)]
+    rows = []
+    before_by_name = {scenario['name']: scenario for scenario in baseline['scenarios']}
+    check_traffic = not baseline['config'].get('fail_rate') and not current['config'].get('fail_rate')
+    for scenario in current['scenarios']:
+        before = before_by_name.get(scenario['name'])
+        if before is None:
+            continue
+        earlier = dict(timings(before))
+        for metric, seconds in timings(scenario):
+            if metric in earlier:
+                limit = earlier[metric] * MAX_SLOWDOWN + MIN_SECONDS
+                rows.append((scenario['name'], metric, earlier[metric], seconds, seconds > limit))
+        if check_traffic and scenario['name'] not in VARIABLE_TRAFFIC:
+            for server, counter in TRAFFIC:
+                old = before['servers'].get(server, {}).get(counter, 0)
+                new = scenario['servers'].get(server, {}).get(counter, 0)
+                rows.append((scenario['name'], f'{server} {counter}', old, new, new > old * MAX_GROWTH))
+    return rows
+
+
+def _number(value):
+    return f'{value:.2f}' if isinstance(value, float) else str(value)
+
+
+def table(rows, only_regressions=False):
+    lines = ['| scenario | metric | baseline | now | |', '|---|---|---:|---:|---|']
+    for name, metric, before, after, regressed in rows:
+        if regressed or not only_regressions:
+            flag = 'worse' if regressed else ''
+            lines.append(f"| {name} | {metric} | {_number(before)} | {_number(after)} | {flag} |")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fail if a benchmark result regressed against a baseline.")
+    parser.add_argument('baseline', help="an earlier bench/run.py --out file")
+    parser.add_argument('current', help="the bench/run.py --out file to check")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; nothing to compare against.")
+        return 0
+    baseline, current = load(args.baseline), load(args.current)
+
+    differing = [key for key in COMPARED_CONFIG if baseline['config'].get(key) != current['config'].get(key)]
+    if differing:
+        print(f"Baseline ran with different {', '.join(differing)}; not comparing.")
+        return 0
+
+    rows = compare(baseline, current)
+    regressions = [row for row in rows if row[4]]
+    report = table(rows, only_regressions=False)
+    print(report)
+    summary = os.getenv('GITHUB_STEP_SUMMARY')
+    if summary:
+        with open(summary, 'a', encoding='utf-8') as f:
+            f.write(f"### Benchmark vs baseline: {os.path.basename(args.current)}\n\n{report}\n\n")
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) against {args.baseline}:")
+        print(table(regressions, only_regressions=True))
+        return 1
+    print(f"\nNo regressions against {args.baseline}.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
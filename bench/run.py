@@ -0,0 +1,266 @@
+import argparse
+import json
+import os
+import posixpath
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from standins import Faults, FTPServer, LeagueSite, SMTPSink
+
+# ============================================================
+# End-to-End Benchmark
+# ============================================================
+# Runs the real scrapers against local stand-ins (standins.py),
+# so there's no network and nothing is actually published:
+#
+#     python bench/run.py --leagues 10 --pdf-kb 500 --latency-ms 20
+#
+# Scenarios, each a fresh process sharing one state directory:
+#
+#   cold         every league is new: download, upload, email
+#   warm         nothing changed since cold
+#   regenerated  same standings re-exported with new timestamps
+#   changed      half the leagues have new standings
+#   single       scraper_weds-mixers.py on its own, new standings
+#   crashed      a league has new standings; the run is killed as
+#                soon as its first file goes live on the FTP host
+#   resumed      nothing new: the journal finishes that publish,
+#                and exactly one email goes out
+#   smtp-down    new standings, but the mail server refuses them
+#   smtp-back    nothing new: the outbox sends that one email
+#
+# crashed and smtp-down are expected to exit non-zero. A scenario
+# that exits otherwise, or sends the wrong number of emails, is
+# marked "unexpected" and makes the benchmark exit 1.
+#
+# --mirror adds a local directory as a second publish target,
+# --s3-endpoint an S3-compatible one (point it at a local MinIO).
+#
+# Results (per-stage timings from metrics.py's spans, per-league
+# times, what each stand-in served) are printed as JSON, or
+# written to --out for CI to keep and compare (bench/compare.py).
+# ============================================================
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REAL_LEAGUES = ['weds-mixers', 'roto-rooters-trios', 'mag-7-high-performance']
+
+
+def league_ids(count):
+    extra = [f'league-{n:02d}' for n in range(len(REAL_LEAGUES) + 1, count + 1)]
+    return (REAL_LEAGUES + extra)[:count]
+
+
+def write_registry(path, site, leagues):
+    lines = [
+        '[defaults]',
+        'resolver = "standings-page"',
+        'public_base = "http://bench.invalid"',
+        'subject = "New {title} PDF Posted!"',
+        'body = "A new {title} PDF is available: {url}"',
+        'enabled = true',
+    ]
+    for league in leagues:
+        lines += [
+            '',
+            '[[league]]',
+            f'id = "{league}"',
+            f'title = "Bench {league}"',
+            f'standings_url = "{site.standings_url(league)}"',
+            f'ftp_dir = "league_pdfs/{league}"',
+        ]
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
+
+
+def snapshot(stats):
+    return dict(stats)
+
+
+def difference(after, before):
+    return {key: value - before.get(key, 0) for key, value in after.items() if value != before.get(key, 0)}
+
+
+def read_spans(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return [json.loads(line) for line in f if line.strip()]
+    except (OSError, ValueError):
+        return []
+
+
+def summarize(spans):
+    stages = {}
+    leagues = {}
+    for span in spans:
+        entry = stages.setdefault(span['stage'], {'count': 0, 'total': 0.0, 'max': 0.0, 'errors': 0,
+                                                  'bytes': 0, 'retries': 0})
+        entry['count'] += 1
+        entry['total'] = round(entry['total'] + span['seconds'], 4)
+        entry['max'] = max(entry['max'], span['seconds'])
+        entry['errors'] += span['outcome'] != 'ok'
+        entry['bytes'] += span.get('bytes', 0)
+        entry['retries'] += span.get('retries', 0)
+        if span['stage'] == 'league':
+            leagues[span['league']] = {'seconds': span['seconds'], 'result': span.get('result', span['outcome'])}
+    return dict(sorted(stages.items())), leagues
+
+
+def run_scenario(name, script, args, env, workdir, servers, timeout, kill_when=None):
+    # kill_when: an Event; once it's set the scraper is killed outright
+    before = {kind: snapshot(server.stats) for kind, server in servers.items()}
+    spans_path = os.path.join(workdir, f'spans-{name}.jsonl')
+    env = dict(env, METRICS='1', METRICS_JSONL=spans_path, METRICS_PROM=os.path.join(workdir, f'{name}.prom'))
+    command = [sys.executable, os.path.join(ROOT, script)] + args
+
+    start = time.perf_counter()
+    process = subprocess.Popen(command, cwd=workdir, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                               text=True)
+    if kill_when is not None:
+        def killer():
+            if kill_when.wait(timeout):
+                process.kill()
+        threading.Thread(target=killer, daemon=True).start()
+    try:
+        output, _ = process.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        output, _ = process.communicate()
+    wall = time.perf_counter() - start
+
+    with open(os.path.join(workdir, f'{name}.log'), 'w', encoding='utf-8') as f:
+        f.write(output)
+    stages, leagues = summarize(read_spans(spans_path))
+
+    return {
+        'name': name,
+        'script': script,
+        'exit_code': process.returncode,
+        'killed': kill_when is not None and kill_when.is_set(),
+        'wall_seconds': round(wall, 3),
+        'stages': stages,
+        'leagues': leagues,
+        'servers': {kind: difference(snapshot(server.stats), before[kind]) for kind, server in servers.items()},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the scrapers against local stand-ins.")
+    parser.add_argument('--leagues', type=int, default=3, help="how many leagues (default 3)")
+    parser.add_argument('--pdf-kb', type=int, default=100, help="size of each PDF in KiB")
+    parser.add_argument('--latency-ms', type=float, default=0, help="added to every request/command")
+    parser.add_argument('--fail-rate', type=float, default=0, help="chance of a temporary error, 0-1")
+    parser.add_argument('--host-rate', type=float, default=0,
+                        help="per-host requests/second (fetcher.py); default 0 = unlimited")
+    parser.add_argument('--mirror', action='store_true', help="also publish to a local directory mirror")
+    parser.add_argument('--s3-endpoint', help="also publish to s3://bench/ here (e.g. a local MinIO; needs boto3)")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--timeout', type=float, default=600, help="seconds per scenario")
+    parser.add_argument('--keep', action='store_true', help="keep the work directory (logs, state)")
+    parser.add_argument('--out', help="write the JSON results here instead of stdout")
+    args = parser.parse_args(argv)
+
+    leagues = league_ids(args.leagues)
+    faults = dict(latency=args.latency_ms / 1000, fail_rate=args.fail_rate)
+    site = LeagueSite(leagues, pdf_bytes=args.pdf_kb * 1024, faults=Faults(seed=args.seed, **faults))
+    ftp = FTPServer(faults=Faults(seed=args.seed + 1, **faults))
+    smtp = SMTPSink(faults=Faults(seed=args.seed + 2, **faults))
+    servers = {'http': site, 'ftp': ftp, 'smtp': smtp}
+
+    workdir = tempfile.mkdtemp(prefix='scraper-bench-')
+    registry = os.path.join(workdir, 'leagues.toml')
+    write_registry(registry, site, leagues)
+    env = dict(
+        os.environ,
+        LEAGUES_FILE=registry,
+        CATALOG_FILE=os.path.join(workdir, 'league_catalog.toml'),
+        STATE_DIR=os.path.join(workdir, 'state'),
+        FTP_HOST='127.0.0.1', FTP_PORT=str(ftp.port), FTP_USERNAME='bench', FTP_PASSWORD='bench', FTP_TLS='0',
+        SMTP_SERVER='127.0.0.1', SMTP_PORT=str(smtp.port), SMTP_STARTTLS='0', SMTP_USER='', SMTP_PASS='',
+        SMTP_MIN_INTERVAL='0', HOST_RATE=str(args.host_rate),
+        EMAIL_FROM='bench@bench.invalid', EMAIL_TO='league@bench.invalid',
+        SUBSCRIBERS_FILE=os.path.join(workdir, 'subscribers.json'),
+    )
+    targets = ['ftp']
+    if args.mirror:
+        targets.append(f"dir:{os.path.join(workdir, 'mirror')}")
+    if args.s3_endpoint:
+        targets.append('s3://bench/')
+        env['S3_ENDPOINT_URL'] = args.s3_endpoint
+    env['PUBLISH_TARGETS'] = ','.join(targets)
+
+    def scenario(name, script='run_all_scrapers.py', script_args=(), succeeds=True, emails=None, kill_when=None):
+        result = run_scenario(name, script, list(script_args), env, workdir, servers, args.timeout, kill_when)
+        sent = result['servers']['smtp'].get('messages', 0)
+        result['expected'] = ((result['exit_code'] == 0) == succeeds) and (emails is None or sent == emails)
+        note = '' if result['expected'] else f"  unexpected ({sent} email(s))"
+        print(f"{name:<12} {result['wall_seconds']:>7.2f}s  exit {result['exit_code']}{note}", file=sys.stderr)
+        return result
+
+    def kill_on_first_pointer():
+        # Set once a dated pointer goes live: past the download, before the email
+        event = threading.Event()
+
+        def on_rename(path):
+            if posixpath.basename(path).startswith('standings_'):
+                event.set()
+        ftp.on_rename = on_rename
+        return event
+
+    results = []
+    try:
+        results.append(scenario('cold'))
+        results.append(scenario('warm'))
+        site.regenerate = True
+        results.append(scenario('regenerated'))
+        site.regenerate = False
+        site.bump(leagues[::2])
+        results.append(scenario('changed'))
+        site.bump(leagues[:1])
+        results.append(scenario('single', f'scraper_{leagues[0]}.py'))
+        site.bump(leagues[-1:])
+        results.append(scenario('crashed', succeeds=False, emails=0, kill_when=kill_on_first_pointer()))
+        ftp.on_rename = None
+        results.append(scenario('resumed', emails=1))
+        smtp.down = True
+        site.bump(leagues[-1:])
+        results.append(scenario('smtp-down', succeeds=False, emails=0))
+        smtp.down = False
+        results.append(scenario('smtp-back', emails=1))
+    finally:
+        for server in servers.values():
+            server.close()
+
+    report = {
+        'config': {
+            'leagues': args.leagues,
+            'pdf_kb': args.pdf_kb,
+            'latency_ms': args.latency_ms,
+            'fail_rate': args.fail_rate,
+            'host_rate': args.host_rate,
+            'targets': targets,
+            'seed': args.seed,
+            'python': sys.version.split()[0],
+        },
+        'scenarios': results,
+        'total_seconds': round(sum(result['wall_seconds'] for result in results), 3),
+    }
+    output = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+    if args.keep:
+        print(f"Work directory kept at {workdir}", file=sys.stderr)
+    else:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return 0 if all(result['expected'] for result in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
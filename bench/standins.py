@@ -0,0 +1,525 @@
+import hashlib
+import posixpath
+import random
+import re
+import socket
+import socketserver
+import sys
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ============================================================
+# Local Stand-ins for the Outside World
+# ============================================================
+# Just enough of leaguesecretary.com, the FTP host and an SMTP
+# server for the scrapers to run against without a network:
+#
+#   LeagueSite  — standings pages with a #customExport link and
+#                 the PDFs behind them (ETag / 304 supported)
+#   FTPServer   — in-memory filesystem, PASV transfers, the
+#                 commands ftp_pool/archive/manifest use
+#                 (REST/APPE resumes, XCRC and HASH checks)
+#   SMTPSink    — accepts and counts messages, delivers nowhere
+#
+# For the failure scenarios, FTPServer.on_rename lets the bench
+# react to a file going live (e.g. kill the scraper mid-publish)
+# and SMTPSink.down refuses every message.
+#
+# Each takes `latency` (seconds added to every request/command)
+# and `fail_rate` (chance a request/transfer/message gets a
+# temporary error: HTTP 503, FTP 451, SMTP 451), and counts what
+# it served in `stats`. A failed FTP upload keeps the first half
+# of what arrived, as a dropped link would. CWD, SIZE, MDTM and
+# RETR fail at a fifth of that rate (an upload takes a dozen
+# commands) with a 421, and the connection is closed.
+# ============================================================
+
+
+FLAKY_FTP_COMMANDS = {'CWD', 'SIZE', 'MDTM', 'RETR'}
+FLAKY_COMMAND_SHARE = 0.2
+
+
+class Faults:
+    def __init__(self, latency=0.0, fail_rate=0.0, seed=None):
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def delay(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def fail(self, share=1.0):
+        with self.lock:
+            return self.random.random() < self.fail_rate * share
+
+
+class Stats(dict):
+    def __init__(self):
+        super().__init__()
+        self.lock = threading.Lock()
+
+    def add(self, key, amount=1):
+        with self.lock:
+            self[key] = self.get(key, 0) + amount
+
+
+def _serve(server):
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+# ------------------------------------------------------------
+# Fake standings PDFs
+# ------------------------------------------------------------
+
+def _pdf_text(text):
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def make_pdf(title, rows, printed_at, pad_bytes=0):
+    # A real (if minimal) one-page PDF that pypdf can read the rows out of
+    lines = [title, f"Printed {printed_at}", "Place Team Pts Won Pts Lost Avg"]
+    lines += [f"{place} {team} {won} {lost} {avg}" for place, team, won, lost, avg in rows]
+    text = ' T* '.join(f'({_pdf_text(line)}) Tj' for line in lines)
+    content = f'BT /F1 10 Tf 14 TL 50 760 Td {text} ET'.encode('latin-1')
+    padding = random.Random(title).randbytes(pad_bytes)
+
+    objects = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        b'<< /Type /Pages /Kids [3 0 R] /Count 1 >>',
+        b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] '
+        b'/Resources << /Font << /F1 4 0 R >> >> /Contents 5 0 R >>',
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>',
+        b'<< /Length %d >>\nstream\n' % len(content) + content + b'\nendstream',
+        b'<< /Length %d >>\nstream\n' % len(padding) + padding + b'\nendstream',
+    ]
+    out = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b'%d 0 obj\n' % number + body + b'\nendobj\n'
+    xref = len(out)
+    out += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    out += b''.join(b'%010d 00000 n \n' % offset for offset in offsets)
+    out += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def make_rows(league, version, teams=12):
+    rng = random.Random(f'{league}-{version}')
+    rows = []
+    for place in range(1, teams + 1):
+        won = rng.randint(20, 80)
+        rows.append((place, f"Team {league[:6]} {place}", won, 100 - won, rng.randint(140, 220)))
+    return rows
+
+
+# ------------------------------------------------------------
+# HTTP: leaguesecretary.com
+# ------------------------------------------------------------
+
+class LeagueSite:
+    def __init__(self, leagues, pdf_bytes=100_000, faults=None):
+        self.leagues = list(leagues)
+        self.pdf_bytes = pdf_bytes
+        self.faults = faults or Faults()
+        self.stats = Stats()
+        self.versions = {league: 1 for league in self.leagues}
+        self.regenerate = False  # new "Printed" timestamp on every download
+        self._lock = threading.Lock()
+        self._fixed = {}
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_HEAD(self):
+                self.do_GET(head=True)
+
+            def do_GET(self, head=False):
+                site.faults.delay()
+                site.stats.add('requests')
+                if site.faults.fail():
+                    site.stats.add('injected_failures')
+                    return self.send_error(503)
+                match = re.fullmatch(r'/league/([\w-]+)/standings', self.path)
+                if match and match.group(1) in site.versions:
+                    return self.reply(site.page(match.group(1)), 'text/html', head=head)
+                match = re.fullmatch(r'/pdf/([\w-]+)\.pdf', self.path)
+                if match and match.group(1) in site.versions:
+                    body = site.pdf(match.group(1))
+                    etag = '"%s"' % hashlib.sha256(body).hexdigest()[:16]
+                    if self.headers.get('If-None-Match') == etag:
+                        site.stats.add('not_modified')
+                        self.send_response(304)
+                        self.end_headers()
+                        return
+                    site.stats.add('pdf_bytes', len(body))
+                    return self.reply(body, 'application/pdf', etag=etag, head=head)
+                self.send_error(404)
+
+            def reply(self, body, content_type, etag=None, head=False):
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                if etag:
+                    self.send_header('ETag', etag)
+                self.end_headers()
+                if not head:
+                    self.wfile.write(body)
+
+        self.server = _serve(ThreadingHTTPServer(('127.0.0.1', 0), Handler))
+        self.base_url = f'http://127.0.0.1:{self.server.server_address[1]}'
+
+    def standings_url(self, league):
+        return f'{self.base_url}/league/{league}/standings'
+
+    def page(self, league):
+        return (
+            f'<html><body><h1>{league} standings</h1>'
+            f'<a id="customExport" href="/pdf/{league}.pdf" class="btn">Export</a>'
+            f'</body></html>'
+        ).encode('utf-8')
+
+    def pdf(self, league):
+        version = self.versions[league]
+        printed = datetime.now(timezone.utc).isoformat() if self.regenerate else f'version {version}'
+        key = (league, version, printed)
+        with self._lock:
+            if key not in self._fixed:
+                title, rows = f'{league} Standings', make_rows(league, version)
+                body = make_pdf(title, rows, printed)
+                pad = max(0, self.pdf_bytes - len(body) - 64)  # the padding stream's own overhead
+                if pad:
+                    body = make_pdf(title, rows, printed, pad)
+                self._fixed = {k: v for k, v in self._fixed.items() if k[0] != league}
+                self._fixed[key] = body
+            return self._fixed[key]
+
+    def bump(self, leagues=None):
+        # New standings for these leagues (all by default)
+        for league in leagues or self.leagues:
+            self.versions[league] += 1
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+# ------------------------------------------------------------
+# FTP
+# ------------------------------------------------------------
+
+class FTPServer:
+    def __init__(self, faults=None):
+        self.faults = faults or Faults()
+        self.stats = Stats()
+        self.files = {}  # absolute path -> (bytes, mtime)
+        self.dirs = {'/'}
+        self.lock = threading.Lock()
+        self.on_rename = None  # called with the new path after every RNTO
+        ftp = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def setup(self):
+                super().setup()
+                self.cwd = '/'
+                self.rename_from = None
+                self.passive = None
+                self.rest = 0
+
+            def reply(self, line):
+                self.wfile.write(f'{line}\r\n'.encode('utf-8'))
+
+            def path(self, name):
+                return posixpath.normpath(posixpath.join(self.cwd, name or '.'))
+
+            def handle(self):
+                ftp.stats.add('connections')
+                self.reply('220 bench FTP ready')
+                for raw in self.rfile:
+                    line = raw.decode('utf-8', 'replace').rstrip('\r\n')
+                    command, _, arg = line.partition(' ')
+                    command = command.upper()
+                    ftp.faults.delay()
+                    ftp.stats.add('commands')
+                    handler = getattr(self, f'ftp_{command}', None)
+                    if command in FLAKY_FTP_COMMANDS and ftp.faults.fail(FLAKY_COMMAND_SHARE):
+                        ftp.stats.add('injected_failures')
+                        self.reply('421 Service not available (injected)')
+                        return
+                    if handler is None:
+                        self.reply(f'502 {command} not implemented')
+                    elif handler(arg) is False:
+                        return
+
+            def ftp_USER(self, arg):
+                self.reply('331 Password required')
+
+            def ftp_PASS(self, arg):
+                ftp.stats.add('logins')
+                self.reply('230 Logged in')
+
+            def ftp_SYST(self, arg):
+                self.reply('215 UNIX Type: L8')
+
+            def ftp_FEAT(self, arg):
+                self.reply('211-Features:\r\n SIZE\r\n MDTM\r\n REST STREAM\r\n XCRC\r\n'
+                           ' HASH SHA-256*;CRC32\r\n211 End')
+
+            def ftp_TYPE(self, arg):
+                self.reply('200 Type set')
+
+            def ftp_NOOP(self, arg):
+                self.reply('200 OK')
+
+            def ftp_QUIT(self, arg):
+                self.reply('221 Bye')
+                return False
+
+            def ftp_PWD(self, arg):
+                self.reply(f'257 "{self.cwd}"')
+
+            def ftp_CWD(self, arg):
+                path = self.path(arg)
+                if path not in ftp.dirs:
+                    return self.reply('550 No such directory')
+                self.cwd = path
+                self.reply('250 OK')
+
+            def ftp_CDUP(self, arg):
+                self.ftp_CWD('..')
+
+            def ftp_MKD(self, arg):
+                path = self.path(arg)
+                with ftp.lock:
+                    if path in ftp.dirs or posixpath.dirname(path) not in ftp.dirs:
+                        return self.reply('550 Cannot create directory')
+                    ftp.dirs.add(path)
+                self.reply(f'257 "{path}" created')
+
+            def ftp_SIZE(self, arg):
+                entry = ftp.files.get(self.path(arg))
+                if entry is None:
+                    return self.reply('550 No such file')
+                self.reply(f'213 {len(entry[0])}')
+
+            def ftp_MDTM(self, arg):
+                entry = ftp.files.get(self.path(arg))
+                if entry is None:
+                    return self.reply('550 No such file')
+                self.reply('213 ' + time.strftime('%Y%m%d%H%M%S', time.gmtime(entry[1])))
+
+            def ftp_DELE(self, arg):
+                with ftp.lock:
+                    if ftp.files.pop(self.path(arg), None) is None:
+                        return self.reply('550 No such file')
+                self.reply('250 Deleted')
+
+            def ftp_RNFR(self, arg):
+                if self.path(arg) not in ftp.files:
+                    return self.reply('550 No such file')
+                self.rename_from = self.path(arg)
+                self.reply('350 Ready for RNTO')
+
+            def ftp_RNTO(self, arg):
+                with ftp.lock:
+                    entry = ftp.files.pop(self.rename_from, None)
+                    if entry is None:
+                        return self.reply('503 RNFR first')
+                    ftp.files[self.path(arg)] = entry
+                if ftp.on_rename:
+                    ftp.on_rename(self.path(arg))
+                self.reply('250 Renamed')
+
+            def ftp_XCRC(self, arg):
+                entry = ftp.files.get(self.path(arg))
+                if entry is None:
+                    return self.reply('550 No such file')
+                self.reply(f'250 {zlib.crc32(entry[0]):08X}')
+
+            def ftp_OPTS(self, arg):
+                self.reply('200 OK')
+
+            def ftp_HASH(self, arg):
+                entry = ftp.files.get(self.path(arg))
+                if entry is None:
+                    return self.reply('550 No such file')
+                digest = hashlib.sha256(entry[0]).hexdigest()
+                self.reply(f'213 SHA-256 0-{len(entry[0])} {digest} {arg}')
+
+            def ftp_REST(self, arg):
+                self.rest = int(arg)
+                self.reply(f'350 Restarting at {self.rest}')
+
+            def ftp_PASV(self, arg):
+                if self.passive:
+                    self.passive.close()
+                self.passive = socket.create_server(('127.0.0.1', 0))
+                port = self.passive.getsockname()[1]
+                self.reply(f'227 Entering Passive Mode (127,0,0,1,{port >> 8},{port & 255})')
+
+            def data_connection(self):
+                if self.passive is None:
+                    self.reply('425 Use PASV first')
+                    return None
+                self.passive.settimeout(10)
+                conn, _ = self.passive.accept()
+                self.passive.close()
+                self.passive = None
+                return conn
+
+            def ftp_RETR(self, arg):
+                entry = ftp.files.get(self.path(arg))
+                if entry is None:
+                    return self.reply('550 No such file')
+                conn = self.data_connection()
+                if conn is None:
+                    return
+                self.reply('150 Opening data connection')
+                with conn:
+                    conn.sendall(entry[0][self.rest:])
+                ftp.stats.add('bytes_sent', len(entry[0]) - self.rest)
+                self.rest = 0
+                self.reply('226 Transfer complete')
+
+            def receive(self, arg, append=False):
+                conn = self.data_connection()
+                if conn is None:
+                    return
+                self.reply('150 Ready to receive')
+                chunks = []
+                with conn:
+                    while True:
+                        chunk = conn.recv(65536)
+                        if not chunk:
+                            break
+                        chunks.append(chunk)
+                data = b''.join(chunks)
+                received = len(data)
+                failed = ftp.faults.fail()
+                if failed:
+                    # Like a link dropping mid-transfer: the server keeps what
+                    # arrived before it went
+                    data = data[:len(data) // 2]
+                path = self.path(arg)
+                with ftp.lock:
+                    old = ftp.files.get(path, (b'', 0))[0]
+                    if append:
+                        data = old + data
+                    elif self.rest:
+                        data = old[:self.rest] + data
+                    ftp.files[path] = (data, time.time())
+                self.rest = 0
+                ftp.stats.add('bytes_received', received)
+                if failed:
+                    ftp.stats.add('injected_failures')
+                    return self.reply('451 Transfer aborted (injected)')
+                ftp.stats.add('uploads')
+                self.reply('226 Transfer complete')
+
+            def ftp_STOR(self, arg):
+                self.receive(arg)
+
+            def ftp_APPE(self, arg):
+                self.receive(arg, append=True)
+
+            def ftp_NLST(self, arg):
+                conn = self.data_connection()
+                if conn is None:
+                    return
+                path = self.path(arg)
+                names = sorted({posixpath.basename(p) for p in list(ftp.files) + list(ftp.dirs)
+                                if posixpath.dirname(p) == path and p != path})
+                self.reply('150 Listing')
+                with conn:
+                    conn.sendall(''.join(f'{name}\r\n' for name in names).encode('utf-8'))
+                self.reply('226 Done')
+
+        class Server(socketserver.ThreadingTCPServer):
+            daemon_threads = True
+            allow_reuse_address = True
+
+            def handle_error(self, request, client_address):
+                # A client killed mid-command (the crashed scenario) isn't news
+                if not isinstance(sys.exc_info()[1], ConnectionError):
+                    super().handle_error(request, client_address)
+
+        self.server = _serve(Server(('127.0.0.1', 0), Handler))
+        self.port = self.server.server_address[1]
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+# ------------------------------------------------------------
+# SMTP
+# ------------------------------------------------------------
+
+class SMTPSink:
+    def __init__(self, faults=None):
+        self.faults = faults or Faults()
+        self.stats = Stats()
+        self.messages = []
+        self.down = False  # refuse every message, like a mail server that's out
+        sink = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def reply(self, line):
+                self.wfile.write(f'{line}\r\n'.encode('utf-8'))
+
+            def handle(self):
+                sink.stats.add('connections')
+                self.reply('220 bench SMTP ready')
+                recipients = []
+                for raw in self.rfile:
+                    command = raw.decode('utf-8', 'replace').strip().split(' ', 1)[0].upper()
+                    sink.faults.delay()
+                    if command in ('EHLO', 'HELO'):
+                        self.reply('250 bench')
+                    elif command == 'MAIL':
+                        recipients = []
+                        self.reply('250 OK')
+                    elif command == 'RCPT':
+                        recipients.append(raw.decode('utf-8', 'replace').strip())
+                        self.reply('250 OK')
+                    elif command == 'DATA':
+                        self.reply('354 End data with <CR><LF>.<CR><LF>')
+                        lines = []
+                        for data in self.rfile:
+                            if data in (b'.\r\n', b'.\n'):
+                                break
+                            lines.append(data)
+                        if sink.down or sink.faults.fail():
+                            sink.stats.add('injected_failures')
+                            self.reply('451 Try again later (injected)')
+                            continue
+                        sink.messages.append((recipients, b''.join(lines)))
+                        sink.stats.add('messages')
+                        self.reply('250 Queued')
+                    elif command in ('RSET', 'NOOP'):
+                        self.reply('250 OK')
+                    elif command == 'QUIT':
+                        self.reply('221 Bye')
+                        return
+                    else:
+                        self.reply('502 Not implemented')
+
+        class Server(socketserver.ThreadingTCPServer):
+            daemon_threads = True
+            allow_reuse_address = True
+
+        self.server = _serve(Server(('127.0.0.1', 0), Handler))
+        self.port = self.server.server_address[1]
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
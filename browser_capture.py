@@ -0,0 +1,100 @@
+import base64
+import json
+
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+
+from pdf_store import store_bytes
+
+# ============================================================
+# Capture the Exported PDF From the Browser
+# ============================================================
+# When we do have to click customExport in Chrome, the browser
+# has already downloaded the PDF by the time we'd read its URL —
+# so take the bytes from Chrome instead of fetching them again.
+#
+# Chrome's performance log (enabled in browser_pool.py) carries
+# the DevTools Network events for every tab. After the click we
+# wait for an application/pdf response to finish loading, then
+# ask DevTools for its body. No fixed sleeps, no polling the
+# window count.
+#
+# If the body can't be read (e.g. the PDF viewer swallowed it)
+# we fall back to handing back the URL for a normal download.
+# ============================================================
+
+EXPORT_BUTTON = (By.ID, "customExport")
+CAPTURE_TIMEOUT = 20
+
+
+class PdfResponseWatcher:
+    # Reads Network events out of the performance log as they come in
+    def __init__(self, driver):
+        self.driver = driver
+        self.responses = {}  # requestId -> (url, target id)
+        self.finished = set()
+
+    def drain(self):
+        for entry in self.driver.get_log('performance'):
+            try:
+                envelope = json.loads(entry['message'])
+                message = envelope['message']
+            except (KeyError, ValueError):
+                continue
+            method = message.get('method')
+            params = message.get('params', {})
+            if method == 'Network.responseReceived':
+                response = params.get('response', {})
+                if 'pdf' in response.get('mimeType', '').lower():
+                    self.responses[params['requestId']] = (response.get('url'), envelope.get('webview'))
+            elif method == 'Network.loadingFinished':
+                self.finished.add(params.get('requestId'))
+
+    def completed_pdf(self, _driver=None):
+        self.drain()
+        for request_id, (url, target) in self.responses.items():
+            if request_id in self.finished:
+                return request_id, url, target
+        return None
+
+
+def read_body(driver, request_id, target):
+    # DevTools commands run against the current window, so switch to the
+    # tab that made the request (window handles are DevTools target ids)
+    if target:
+        for handle in driver.window_handles:
+            if handle.upper() == target.upper():
+                driver.switch_to.window(handle)
+                break
+    body = driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': request_id})
+    if body.get('base64Encoded'):
+        return base64.b64decode(body['body'])
+    return body['body'].encode('latin-1')
+
+
+def capture_pdf(driver, page_url, directory):
+    # Returns a StoredPDF with the captured bytes, or the PDF's URL if
+    # Chrome wouldn't give up the body
+    driver.execute_cdp_cmd('Network.enable', {})
+    driver.get(page_url)
+
+    export_button = WebDriverWait(driver, 15).until(EC.element_to_be_clickable(EXPORT_BUTTON))
+    driver.execute_script("arguments[0].scrollIntoView(true);", export_button)
+
+    watcher = PdfResponseWatcher(driver)
+    watcher.drain()  # throw away everything from loading the page itself
+    driver.execute_script("arguments[0].click();", export_button)
+
+    request_id, pdf_url, target = WebDriverWait(driver, CAPTURE_TIMEOUT, poll_frequency=0.1).until(
+        watcher.completed_pdf, message="No PDF response seen after clicking export."
+    )
+    print(f"Resolved PDF URL: {pdf_url}")
+
+    try:
+        stored = store_bytes(read_body(driver, request_id, target), directory, pdf_url)
+    except Exception as e:
+        print(f"Couldn't read the PDF out of the browser ({e}), will download it instead.")
+        return pdf_url
+    print(f"Captured {stored.size} byte PDF straight from the browser.")
+    return stored
@@ -0,0 +1,164 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from metrics import span
+
+# ============================================================
+# Shared Headless Chrome Pool
+# ============================================================
+# Launching Chrome is the slowest part of a scraper run, so
+# run_all_scrapers.py starts it once and lends it out: each
+# league gets a fresh tab in an already-warm browser instead of
+# a cold launch of its own.
+#
+# A driver is only ever used by one league at a time (chromedriver
+# sessions are not thread-safe), so `size` is also the number of
+# leagues that can drive a browser at once. Instances that stop
+# answering are quit and relaunched; instances that have served
+# `max_uses` tabs are recycled so Chrome's memory doesn't creep.
+# ============================================================
+
+CHROME_ARGS = [
+    "--headless",
+    "--disable-gpu",
+    "--no-sandbox",
+    "--window-size=1920,1080",
+]
+
+
+class BrowserPool:
+    def __init__(self, size=1, max_uses=50):
+        self.size = size
+        self.max_uses = max_uses
+        self.launches = []  # seconds spent on each Chrome launch
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._idle = []
+        self._uses = {}
+        self._closed = False
+
+    def _launch(self):
+        # Imported here so runs that never need a browser don't pay for selenium
+        from selenium import webdriver
+        from selenium.webdriver.chrome.service import Service
+        from selenium.webdriver.chrome.options import Options
+
+        from driver_resolver import driver_path
+
+        print("Launching headless browser...")
+        start = time.perf_counter()
+        chrome_options = Options()
+        for arg in CHROME_ARGS:
+            chrome_options.add_argument(arg)
+        # Network events for browser_capture.py to watch for the PDF
+        chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+        with span('browser_launch'):
+            service = Service(driver_path())
+            driver = webdriver.Chrome(service=service, options=chrome_options)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.launches.append(elapsed)
+        print(f"Browser ready in {elapsed:.1f}s")
+        return driver
+
+    @staticmethod
+    def _healthy(driver):
+        try:
+            driver.window_handles
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _quit(driver):
+        try:
+            driver.quit()
+        except Exception as e:
+            print(f"Error shutting down browser: {e}")
+
+    def _acquire(self):
+        self._slots.acquire()
+        try:
+            while True:
+                with self._lock:
+                    if self._closed:
+                        raise RuntimeError("Browser pool is shut down.")
+                    driver = self._idle.pop() if self._idle else None
+                if driver is None:
+                    driver = self._launch()
+                    with self._lock:
+                        self._uses[driver] = 0
+                if self._healthy(driver):
+                    return driver
+                print("Browser stopped responding, restarting it...")
+                self._discard(driver)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def _discard(self, driver):
+        with self._lock:
+            self._uses.pop(driver, None)
+        self._quit(driver)
+
+    def _release(self, driver, broken):
+        try:
+            with self._lock:
+                uses = self._uses[driver] = self._uses.get(driver, 0) + 1
+            if broken or uses >= self.max_uses:
+                self._discard(driver)
+                return
+            with self._lock:
+                if self._closed:
+                    self._discard(driver)
+                else:
+                    self._idle.append(driver)
+        finally:
+            self._slots.release()
+
+    @staticmethod
+    def _reset(driver, home):
+        # Close everything the league opened and go back to the home tab
+        for handle in driver.window_handles:
+            if handle != home:
+                driver.switch_to.window(handle)
+                driver.close()
+        driver.switch_to.window(home)
+
+    @contextmanager
+    def tab(self):
+        driver = self._acquire()
+        broken = False
+        home = None
+        try:
+            home = driver.current_window_handle
+            driver.switch_to.new_window('tab')
+            yield driver
+        except Exception:
+            broken = not self._healthy(driver)
+            raise
+        finally:
+            if not broken and home is not None:
+                try:
+                    self._reset(driver, home)
+                except Exception:
+                    broken = True
+            self._release(driver, broken)
+
+    def shutdown(self, force=False):
+        # force=True also quits browsers still lent out, e.g. to a league
+        # that blew its timeout — that unsticks it instead of leaving an
+        # orphaned Chrome behind
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            leased = [d for d in list(self._uses) if d not in idle] if force else []
+        for driver in idle + leased:
+            self._discard(driver)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
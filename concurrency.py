@@ -0,0 +1,24 @@
+import os
+import threading
+
+# ============================================================
+# Concurrency Caps
+# ============================================================
+# run_all_scrapers.py runs every league at once, but the things
+# they talk to don't all like being hit in parallel. Each kind of
+# work gets its own cap so e.g. a burst of downloads can't open a
+# pile of FTP logins at the same time.
+#
+#   MAX_BROWSERS — Chrome instances in the shared browser pool
+#   MAX_HTTP     — simultaneous HTTP requests (page + PDF fetches),
+#                  on top of the per-host limits in fetcher.py
+#   MAX_FTP      — simultaneous FTP sessions (enforced by ftp_pool.py)
+#
+# HTTP work takes the slot through fetcher.host_slot(url).
+# ============================================================
+
+MAX_BROWSERS = int(os.getenv('MAX_BROWSERS', 1))
+MAX_HTTP = int(os.getenv('MAX_HTTP', 4))
+MAX_FTP = int(os.getenv('MAX_FTP', 2))
+
+http_slot = threading.BoundedSemaphore(MAX_HTTP)
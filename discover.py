@@ -0,0 +1,218 @@
+import argparse
+import json
+import os
+import re
+import sys
+import tomllib
+from collections import deque
+from urllib.parse import urljoin, urlsplit
+
+from engine import CATALOG_FILE, LEAGUES_FILE, load_leagues, standings_id
+from fetcher import session, host_slot, raise_for_status
+from retry import HTTP_RETRY, clip
+
+# ============================================================
+# League Discovery
+# ============================================================
+# Finds every league at a bowling center on leaguesecretary.com
+# and writes them to the league catalog (league_catalog.toml),
+# which engine.py reads alongside leagues.toml:
+#
+#     python discover.py sunshine-lanes enterprise-park-lanes
+#
+# A center is given by its slug or the URL of any page of it.
+# The crawl starts at the center's league list and follows links
+# that stay inside that center's /bowling-leagues/ pages (league
+# home pages, further list pages) until it has every league's
+# numeric id, or DISCOVERY_MAX_PAGES pages per center. Requests
+# go through fetcher.py, so a crawl is held to the same per-host
+# rate limits as the scrapers.
+#
+# Each league found becomes a standings-page league:
+#
+#     .../bowling-centers/<center>/bowling-leagues/<league>
+#         /league/standings-png/<id>
+#
+# New leagues are written with enabled = false: a center can have
+# hundreds, and an enabled one is published to the public host
+# and emailed to every '*' subscriber. Set enabled = true on the
+# ones you want. Leagues already in leagues.toml (same id or same
+# standings page) are left out. Re-running keeps whatever you
+# changed in the catalog for leagues that are still there (e.g.
+# enabled = true) and drops the ones that are gone.
+# ============================================================
+
+BASE_URL = os.getenv('DISCOVERY_BASE_URL', 'https://www.leaguesecretary.com')
+MAX_PAGES = int(os.getenv('DISCOVERY_MAX_PAGES', 200))
+HTTP_TIMEOUT = 15
+
+LEAGUE_LINK = re.compile(
+    r'^/bowling-centers/(?P<center>[^/]+)/bowling-leagues/(?P<league>[^/]+)'
+    r'(?:/league/[^/]+/(?P<id>\d+))?/?$'
+)
+CENTER_LINK = re.compile(r'^/bowling-centers/(?P<center>[^/]+)(?:/|$)')
+GENERIC_TITLES = {'standings', 'view', 'view standings', 'league', 'home', 'details', 'more', 'recap', 'print'}
+KEEP_FIELDS = ('enabled', 'title', 'ftp_dir', 'poll_interval', 'poll_windows', 'subject', 'body')
+
+
+def center_slug(value):
+    match = CENTER_LINK.match(urlsplit(value).path if '://' in value else f'/bowling-centers/{value}')
+    if not match:
+        raise ValueError(f"'{value}' isn't a bowling center slug or URL")
+    return match.group('center')
+
+
+def center_url(center):
+    return f'{BASE_URL}/bowling-centers/{center}/bowling-leagues'
+
+
+def standings_url(center, league, league_id):
+    return f'{BASE_URL}/bowling-centers/{center}/bowling-leagues/{league}/league/standings-png/{league_id}'
+
+
+def fetch(url):
+    def attempt():
+        with host_slot(url):
+            response = session.get(url, timeout=clip(HTTP_TIMEOUT))
+        raise_for_status(response)
+        return response.text
+    return HTTP_RETRY.call(attempt, what=f"Discovery fetch of {url}")
+
+
+def links(page_url, html):
+    # (absolute url, path, link text) for every <a href> on the page
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, 'html.parser')
+    for anchor in soup.find_all('a', href=True):
+        url = urljoin(page_url, anchor['href']).split('#')[0]
+        yield url, urlsplit(url).path, ' '.join(anchor.get_text(' ').split())
+
+
+def title_from(slug):
+    return ' '.join(word.capitalize() for word in slug.split('-'))
+
+
+def crawl_center(center, max_pages=MAX_PAGES):
+    # {league slug: {'id': ..., 'title': ...}} for one center
+    found = {}
+    start = center_url(center)
+    queue, seen = deque([start]), {start}
+    pages = 0
+    while queue and pages < max_pages:
+        page_url = queue.popleft()
+        match = LEAGUE_LINK.match(urlsplit(page_url).path)
+        if match and found.get(match.group('league'), {}).get('id'):
+            continue  # found its id on another page since we queued it
+        try:
+            html = fetch(page_url)
+        except Exception as e:
+            print(f"Skipping {page_url}: {e}")
+            continue
+        pages += 1
+        for url, path, text in links(page_url, html):
+            match = LEAGUE_LINK.match(path)
+            if match and match.group('center') == center:
+                league = found.setdefault(match.group('league'), {'id': None, 'title': None})
+                if match.group('id'):
+                    league['id'] = league['id'] or match.group('id')
+                if text and text.lower() not in GENERIC_TITLES and not league['title']:
+                    league['title'] = text
+                if match.group('id') or league['id']:
+                    continue
+            elif not path.startswith(f'/bowling-centers/{center}/bowling-leagues'):
+                continue  # another center, or off the league pages entirely
+            if url not in seen and urlsplit(url).netloc == urlsplit(start).netloc:
+                seen.add(url)
+                queue.append(url)
+    missing = sorted(slug for slug, league in found.items() if not league['id'])
+    if missing:
+        print(f"{center}: no standings id found for {', '.join(missing)}")
+    print(f"{center}: {len(found) - len(missing)} league(s) from {pages} page(s)")
+    return {slug: league for slug, league in found.items() if league['id']}
+
+
+def build_catalog(centers, existing, known, max_pages=MAX_PAGES):
+    # existing: the current catalog's entries; known: the leagues in
+    # leagues.toml, which the catalog never repeats
+    known_ids = {league.id for league in known}
+    known_pages = {standings_id(league.standings_url) for league in known} - {None}
+    previous = {entry.get('id'): entry for entry in existing}
+    # Centers we aren't crawling this time keep what they had
+    entries = [entry for entry in existing if entry.get('center') not in centers]
+    used_ids = known_ids | {entry.get('id') for entry in entries}
+
+    for center in centers:
+        for slug, league in sorted(crawl_center(center, max_pages).items()):
+            if league['id'] in known_pages:
+                continue
+            league_id = slug if slug not in used_ids else f'{center}-{slug}'
+            used_ids.add(league_id)
+            entry = {
+                'id': league_id,
+                'title': league['title'] or title_from(slug),
+                'center': center,
+                'standings_url': standings_url(center, slug, league['id']),
+                'ftp_dir': f'league_pdfs/{league_id}',
+                'enabled': False,
+            }
+            old = previous.get(league_id)
+            if old is not None and standings_id(old.get('standings_url')) == league['id']:
+                entry.update({field: old[field] for field in KEEP_FIELDS if field in old})
+            entries.append(entry)
+    return entries
+
+
+def toml_value(value):
+    # JSON's string escapes are valid TOML basic strings
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, list):
+        return '[' + ', '.join(toml_value(item) for item in value) + ']'
+    if isinstance(value, (int, float)):
+        return repr(value)
+    return json.dumps(str(value), ensure_ascii=False)
+
+
+def write_catalog(path, entries):
+    centers = sorted({entry['center'] for entry in entries if entry.get('center')})
+    lines = [
+        '# League catalog, written by discover.py — re-run it to refresh:',
+        f'#     python discover.py {" ".join(centers)}',
+        '# New leagues start disabled; set enabled = true on the ones to publish.',
+        '# Edits to a league here (enabled, title, ...) survive a refresh.',
+        '# Anything not set comes from [defaults] in leagues.toml.',
+    ]
+    for entry in entries:
+        lines += ['', '[[league]]'] + [f'{key} = {toml_value(value)}' for key, value in entry.items()]
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
+    os.replace(tmp_path, path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Find every league at some bowling centers.")
+    parser.add_argument('centers', nargs='+', help="center slugs (e.g. sunshine-lanes) or URLs")
+    parser.add_argument('--catalog', default=CATALOG_FILE, help="where to write the catalog")
+    parser.add_argument('--max-pages', type=int, default=MAX_PAGES, help="pages to crawl per center")
+    args = parser.parse_args(argv)
+
+    try:
+        centers = [center_slug(value) for value in args.centers]
+    except ValueError as e:
+        parser.error(str(e))
+
+    known = load_leagues(LEAGUES_FILE, catalog=None)
+    existing = []
+    if os.path.exists(args.catalog):
+        with open(args.catalog, 'rb') as f:
+            existing = tomllib.load(f).get('league', [])
+    entries = build_catalog(centers, existing, known, args.max_pages)
+    write_catalog(args.catalog, entries)
+    print(f"Wrote {len(entries)} league(s) to {args.catalog}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,139 @@
+import os
+import re
+import shutil
+import subprocess
+import threading
+from contextlib import contextmanager
+
+from state import state_path, load_json, update_json
+
+# ============================================================
+# ChromeDriver Resolution
+# ============================================================
+# ChromeDriverManager().install() asks the internet which driver
+# goes with our Chrome on every launch. The answer only changes
+# when Chrome itself is upgraded, so remember it:
+#
+#   1. state/chromedriver.json, keyed by Chrome's major version
+#   2. a chromedriver already on PATH whose major version matches
+#   3. only then webdriver_manager (network), and remember that
+#
+# Within a run the answer is kept in memory, so every league
+# after the first gets it without touching disk. A lock file
+# keeps two processes from downloading the same driver at once.
+#
+# CHROMEDRIVER=/path/to/chromedriver skips all of this.
+# ============================================================
+
+CHROME_BIN = os.getenv('CHROME_BIN')
+CHROME_CANDIDATES = ['google-chrome', 'google-chrome-stable', 'chromium', 'chromium-browser', 'chrome']
+CHROMEDRIVER = os.getenv('CHROMEDRIVER')
+
+CACHE_FILE = state_path('chromedriver.json')
+LOCK_FILE = state_path('chromedriver.lock')
+
+VERSION = re.compile(r'(\d+)\.\d+')
+
+_lock = threading.Lock()
+_resolved = None
+
+
+def _version_of(binary):
+    try:
+        out = subprocess.run([binary, '--version'], capture_output=True, text=True, timeout=10).stdout
+    except (OSError, subprocess.SubprocessError):
+        return None
+    match = VERSION.search(out)
+    return match.group(1) if match else None
+
+
+def chrome_major():
+    # Major version of the installed Chrome, or None if we can't tell
+    candidates = [CHROME_BIN] if CHROME_BIN else [shutil.which(name) for name in CHROME_CANDIDATES]
+    for binary in filter(None, candidates):
+        major = _version_of(binary)
+        if major:
+            return major
+    return None
+
+
+def _usable(path):
+    return bool(path) and os.path.isfile(path) and os.access(path, os.X_OK)
+
+
+def from_cache(major):
+    entry = load_json(CACHE_FILE, {}).get(major or 'unknown')
+    if entry and _usable(entry.get('path')):
+        return entry['path']
+    return None
+
+
+def from_path(major):
+    path = shutil.which('chromedriver')
+    if not path:
+        return None
+    if major and _version_of(path) != major:
+        print(f"chromedriver on PATH doesn't match Chrome {major}, ignoring it.")
+        return None
+    return path
+
+
+def from_network():
+    from webdriver_manager.chrome import ChromeDriverManager
+
+    print("Fetching ChromeDriver (first run for this Chrome version)...")
+    return ChromeDriverManager().install()
+
+
+def remember(major, path, source):
+    def add(cache):
+        cache[major or 'unknown'] = {'path': path, 'source': source}
+        return cache
+    update_json(CACHE_FILE, add, {})
+
+
+@contextmanager
+def _process_lock():
+    # Only one process resolves at a time; the rest then find it cached
+    try:
+        import fcntl
+    except ImportError:  # Windows has no fcntl; just skip the lock
+        yield
+        return
+    os.makedirs(os.path.dirname(LOCK_FILE) or '.', exist_ok=True)
+    with open(LOCK_FILE, 'w') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def driver_path():
+    global _resolved
+    if _resolved:
+        return _resolved
+    with _lock:
+        if _resolved:
+            return _resolved
+        if _usable(CHROMEDRIVER):
+            _resolved = CHROMEDRIVER
+            return _resolved
+
+        major = chrome_major()
+        with _process_lock():
+            path = from_cache(major)
+            if path:
+                source = 'cache'
+            else:
+                path, source = from_path(major), 'path'
+                if not path:
+                    path, source = from_network(), 'network'
+                remember(major, path, source)
+        print(f"Using chromedriver {path} (Chrome {major or '?'}, from {source})")
+        _resolved = path
+        return _resolved
+
+
+if __name__ == '__main__':
+    print(driver_path())
@@ -0,0 +1,416 @@
+import os
+import sys
+import tomllib
+from datetime import datetime
+
+import history
+import http_cache
+from archive import publish_dated, publish_latest
+from fetcher import session, host_slot, raise_for_status
+from journal import Journal
+from manifest import remote_manifest, build_manifest, publish_manifest
+from metrics import stage, span, current, export as export_metrics
+from notifier import Notifier
+from pdf_resolver import resolve_pdf_url
+from pdf_store import StoredPDF, stream_to_file
+from publishers import MIRROR_WAIT, primary, mirrors, in_background, in_flight, wait_for_mirrors
+from retry import HTTP_RETRY, clip, remaining
+from scheduler import parse_windows
+from standings import extract, standings_digest
+
+# ============================================================
+# League Scraper Engine
+# ============================================================
+# One pipeline for every league in leagues.toml:
+#
+#   find the PDF → download it → compare with what's published →
+#   archive + repoint latest on every target → queue the email
+#
+# Once a new PDF is found, each step after it is recorded in the
+# league's journal (journal.py); a run that died part way is
+# finished off by the next one instead of being redone.
+#
+# Run one league:      python engine.py weds-mixers
+# Run every enabled:   python run_all_scrapers.py
+#
+# Selenium is only imported if a league actually has to fall
+# back to the browser, so the common case never loads it.
+# ============================================================
+
+LEAGUES_FILE = os.getenv('LEAGUES_FILE', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'leagues.toml'))
+CATALOG_FILE = os.getenv('CATALOG_FILE', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'league_catalog.toml'))
+DOWNLOAD_DIR = 'pdfs'
+RESOLVERS = ('standings-page', 'static')
+
+
+class League:
+    def __init__(self, id, title, ftp_dir, resolver='standings-page', standings_url=None, pdf_url=None,
+                 public_base='', subject='', body='', enabled=True, poll_interval=None, poll_windows=None,
+                 center=None):
+        self.id = id
+        self.title = title
+        self.ftp_dir = ftp_dir
+        self.resolver = resolver
+        self.standings_url = standings_url
+        self.pdf_url = pdf_url
+        self.public_base = public_base
+        self.subject = subject
+        self.body = body
+        self.enabled = enabled
+        self.poll_interval = poll_interval
+        self.poll_windows = poll_windows or []
+        self.center = center  # set for leagues found by discover.py
+
+        if resolver not in RESOLVERS:
+            raise ValueError(f"League '{id}': unknown resolver '{resolver}'")
+        if resolver == 'standings-page' and not standings_url:
+            raise ValueError(f"League '{id}': standings_url is required")
+        if resolver == 'static' and not pdf_url:
+            raise ValueError(f"League '{id}': pdf_url is required")
+        if poll_interval is not None and not (isinstance(poll_interval, (int, float)) and poll_interval > 0):
+            raise ValueError(f"League '{id}': poll_interval must be a positive number of seconds")
+        parse_windows(self.poll_windows)  # raises on a malformed window
+
+    def public_url(self, filename):
+        return f"{self.public_base}/{self.ftp_dir}/{filename}"
+
+
+def _read_registry(path, defaults=None):
+    with open(path, 'rb') as f:
+        registry = tomllib.load(f)
+    defaults = {**(defaults or {}), **registry.get('defaults', {})}
+    leagues = []
+    for entry in registry.get('league', []):
+        try:
+            leagues.append(League(**{**defaults, **entry}))
+        except TypeError as e:
+            raise ValueError(f"Bad entry in {path} ({entry.get('id', '?')}): {e}")
+    return defaults, leagues
+
+
+def load_leagues(path=LEAGUES_FILE, catalog=CATALOG_FILE):
+    # leagues.toml, plus whatever discover.py found that it doesn't already
+    # list (by id or by standings page)
+    defaults, leagues = _read_registry(path)
+    if catalog and os.path.exists(catalog):
+        ids = {league.id for league in leagues}
+        pages = {standings_id(league.standings_url) for league in leagues} - {None}
+        for league in _read_registry(catalog, defaults)[1]:
+            if league.id not in ids and standings_id(league.standings_url) not in pages:
+                ids.add(league.id)
+                leagues.append(league)
+    return leagues
+
+
+def standings_id(url):
+    # leaguesecretary standings pages end in the league's numeric id
+    tail = (url or '').rstrip('/').rsplit('/', 1)[-1]
+    return tail if tail.isdigit() else None
+
+
+def get_league(league_id, path=LEAGUES_FILE):
+    for league in load_leagues(path):
+        if league.id == league_id:
+            return league
+    raise KeyError(f"No league '{league_id}' in {path}")
+
+
+@stage('resolve')
+def get_latest_pdf_url(league, pool=None):
+    # Plain HTTP first; Chrome only if the page doesn't give the link away.
+    # The browser path may return the PDF itself rather than its URL.
+    return resolve_pdf_url(league.standings_url, lambda: get_pdf_with_browser(league, pool))
+
+
+@stage('browser')
+def get_pdf_with_browser(league, pool=None):
+    # Imported here so leagues that never need Chrome don't load selenium
+    from browser_capture import capture_pdf
+    from browser_pool import BrowserPool
+
+    # A pool handed in by run_all_scrapers.py keeps Chrome warm between
+    # leagues; run standalone, we spin up a one-off browser just for this.
+    if pool is None:
+        with BrowserPool() as own_pool:
+            return get_pdf_with_browser(league, own_pool)
+
+    print("Opening standings page in headless browser to capture the PDF...")
+    with pool.tab() as driver:
+        try:
+            return capture_pdf(driver, league.standings_url, DOWNLOAD_DIR)
+        except Exception as e:
+            print(f"Error capturing PDF: {e}")
+            raise
+
+
+@stage('download')
+def download_pdf(url):
+    # Streams the PDF to a temp file in DOWNLOAD_DIR and returns it as a
+    # StoredPDF (path, sha256, size) — never holds the whole thing in memory
+    print(f"Downloading PDF from: {url}")
+
+    def attempt():
+        with host_slot(url), session.get(url, timeout=clip(15), stream=True) as response:
+            raise_for_status(response)
+            return stream_to_file(response, DOWNLOAD_DIR)
+    stored = HTTP_RETRY.call(attempt, what="Download")
+    current().add('bytes', stored.size)
+    return stored
+
+
+@stage('download')
+def download_static_pdf(league):
+    # Conditional GET through the HTTP cache; None means 304 Not Modified
+    def attempt():
+        with host_slot(league.pdf_url):
+            return http_cache.conditional_get(league.pdf_url, timeout=clip(10))
+    response = HTTP_RETRY.call(attempt, what="Download")
+    if response.not_modified:
+        print("PDF not modified since last run (HTTP 304).")
+        return None
+    print(f"Downloaded PDF ({response.stored.size} bytes)")
+    current().add('bytes', response.stored.size)
+    # Work on our own name for it so the cached copy stays put
+    return response.stored.link_to(os.path.join(DOWNLOAD_DIR, f'.{league.id}-cached.pdf'))
+
+
+@stage('compare')
+def published_manifest(league):
+    # Returns the manifest of what's published as latest on the primary
+    # target (None if nothing is) — usually without transferring more
+    # than manifest.json. Raises if the target can't be read: treating
+    # that as "nothing published" would re-publish and re-email
+    # unchanged standings.
+    target = primary()
+    print(f"Checking what's published on {target.name} for comparison...")
+
+    def attempt():
+        with target.session() as session:
+            return remote_manifest(session, league.ftp_dir, league.id)
+    try:
+        return target.check_retry.call(attempt, what=f"Checking {target.name}")
+    except Exception as e:
+        raise Exception(f"Could not check what's published on {target.name}: {e}") from e
+
+
+@stage('upload')
+def upload_file(target, path, stored):
+    # Each target retries (and reconnects) on its own, and checks the
+    # bytes against the PDF's hash before they replace anything
+    with open(stored.path, 'rb') as f:
+        target.write(path, f, stored.sha256)
+    current().add('bytes', stored.size)
+    print(f"Uploaded: {path}")
+
+
+@stage('email')
+def send_email(league, filename, notifier):
+    fields = {'title': league.title, 'filename': filename, 'url': league.public_url(filename)}
+    notifier.add(league.id, league.title, league.subject.format(**fields), league.body.format(**fields))
+
+
+@stage('history')
+def record_history(league, stored, rows, pdf_url, filename, standings):
+    # The history database is a convenience; never fail a league over it
+    try:
+        history.record_snapshot(league.id, stored, rows, pdf_url, filename, standings)
+    except Exception as e:
+        print(f"Could not record snapshot in {history.HISTORY_DB}: {e}")
+
+
+def source_done(league):
+    # The static poller may now treat this version as seen (see http_cache)
+    if league.resolver == 'static':
+        http_cache.confirm(league.pdf_url)
+
+
+# Main logic
+def run_league(league, pool=None, notifier=None):
+    # Returns what happened: 'published', 'unchanged' or 'not-modified'.
+    # run_all_scrapers.py passes a shared notifier and sends everything in
+    # one go at the end; run standalone, we send straight away.
+    standalone = notifier is None
+    notifier = notifier or Notifier()
+    with span('league', league=league.id) as league_span:
+        result = _run_league(league, pool, notifier)
+        league_span.set('result', result)
+    if standalone:
+        unsent = notifier.flush()
+        wait_for_mirrors(min(MIRROR_WAIT, max(0, remaining())))
+        if unsent:
+            raise Exception("Failed to send notification email.")
+    return result
+
+
+def _run_league(league, pool, notifier):
+    journal = Journal(league.id)
+    if not in_flight(league.id):
+        journal.sweep()
+    if journal.pending():
+        # An earlier run died part way through publishing; finish that first
+        sha256 = journal.entry['sha256'][:12]
+        kept = journal.stored()
+        if kept is None and journal.missing_mirrors():
+            print(f"The PDF for {sha256} is gone; its mirrors will catch up with the next new one.")
+            for name in journal.missing_mirrors():
+                journal.mirrored(name)
+        step = journal.next_step()
+        if step is None:
+            # Only mirrors were left: catch them up in the background and
+            # carry on looking for something newer
+            _start_mirrors(league, journal, kept)
+            journal.finish_if_done()
+        elif kept or step == 'notified':
+            print(f"Resuming unfinished publish of {sha256} at '{step}'.")
+            _publish(league, journal, kept, notifier)
+            return 'published'
+        else:
+            journal.abandon("its PDF is no longer in the journal")
+
+    print("Checking for updated PDF...")
+    os.makedirs(DOWNLOAD_DIR, exist_ok=True)
+
+    if league.resolver == 'static':
+        stored = download_static_pdf(league)
+        if stored is None:
+            print("Nothing new to publish. Skipping update.")
+            return 'not-modified'
+        pdf_url = league.pdf_url
+    else:
+        resolved = get_latest_pdf_url(league, pool)
+        if isinstance(resolved, StoredPDF):
+            stored, pdf_url = resolved, resolved.source_url  # already captured by the browser
+        else:
+            pdf_url = resolved
+            stored = download_pdf(pdf_url)
+
+    try:
+        published = published_manifest(league) or {}
+    except Exception:
+        stored.discard()
+        raise
+    rows = standings = None
+    if published.get('sha256') == stored.sha256:
+        print("PDF content matches what's published. Skipping update.")
+        unchanged = True
+    else:
+        # Different bytes; but a re-export of the same standings isn't news
+        with span('extract'):
+            rows = extract(stored)
+        standings = standings_digest(rows)
+        unchanged = standings is not None and published.get('standings') == standings
+        if unchanged:
+            print("PDF was regenerated but the standings haven't changed. Skipping update.")
+    if unchanged:
+        stored.discard()
+        source_done(league)
+        return 'unchanged'
+
+    today = datetime.now().strftime('%Y-%m-%d')
+    filename = f'standings_{today}.pdf'
+    pointer_name = f'standings_{today}.html'
+    journal.start(stored, mirrors=[target.name for target in mirrors()], source_url=pdf_url,
+                  pointer_name=pointer_name, standings=standings)
+
+    # Leagues run side by side, so keep their local copies apart
+    stored.move_to(os.path.join(DOWNLOAD_DIR, f'{league.id}_{filename}'))
+    print(f"PDF saved as {filename}")
+    kept = journal.keep(stored)
+
+    _publish(league, journal, kept, notifier, rows)
+    return 'published'
+
+
+def _publish(league, journal, stored, notifier, rows=None):
+    # Everything after the PDF is safely kept, skipping steps the journal
+    # says are already done. `stored` may be None if only the email is left.
+    _start_mirrors(league, journal, stored)
+    pointer_name = journal.entry['pointer_name']
+    title = f"{league.title} Standings"
+
+    if not journal.has('uploaded-latest'):
+        def attempt():
+            with primary().session() as target:
+                if not journal.has('uploaded-dated'):
+                    relative = publish_dated(target, stored, league.ftp_dir, pointer_name, upload_file, title=title)
+                    journal.done('uploaded-dated', target=relative)
+                publish_latest(target, stored, league.ftp_dir, journal.entry['target'], upload_file,
+                               league.public_url(''), title=title)
+                publish_manifest(target, league.ftp_dir, league.id, _manifest(journal.entry, stored))
+
+        with span('publish'):
+            primary().publish_retry.call(attempt, what=f"Publishing to {primary().name}")
+        journal.done('uploaded-latest')
+
+        if rows is None:
+            with span('extract'):
+                rows = extract(stored)  # cached by hash, so cheap on a resume
+        entry = journal.entry
+        record_history(league, stored, rows, entry['source_url'], pointer_name, entry['standings'])
+
+    if not journal.has('notified'):
+        send_email(league, pointer_name, notifier)
+        journal.done('notified')
+
+    journal.finish_if_done()
+    source_done(league)
+
+
+def _manifest(entry, stored):
+    return build_manifest(stored.sha256, stored.size, entry['source_url'], entry['pointer_name'],
+                          entry['target'], entry['standings'])
+
+
+def _start_mirrors(league, journal, stored):
+    # Fan the PDF out to every mirror that doesn't have it yet, without
+    # waiting: a slow mirror mustn't hold up the primary or the email
+    configured = {target.name: target for target in mirrors()}
+    for name in journal.missing_mirrors():
+        target = configured.get(name)
+        if target is None:
+            print(f"{name} is no longer a publish target, skipping it.")
+            journal.mirrored(name)
+        elif in_background((league.id, name), _mirror, league, journal, stored, target) is None:
+            print(f"Still publishing an earlier PDF to {name}; it'll get this one next run.")
+
+
+def _mirror(league, journal, stored, target):
+    entry = journal.entry
+    title = f"{league.title} Standings"
+
+    def attempt():
+        with target.session() as session:
+            relative = publish_dated(session, stored, league.ftp_dir, entry['pointer_name'], upload_file, title=title)
+            publish_latest(session, stored, league.ftp_dir, relative, upload_file, league.public_url(''), title=title)
+            publish_manifest(session, league.ftp_dir, league.id, _manifest(dict(entry, target=relative), stored),
+                             remember=False)
+
+    with span('mirror', league=league.id) as mirror_span:
+        mirror_span.set('target', target.name)
+        try:
+            target.publish_retry.call(attempt, what=f"Publishing to {target.name}")
+        except Exception as e:
+            mirror_span.set('failed', 1)
+            print(f"Couldn't publish to {target.name}, will try again next run: {e}")
+            return False
+    journal.mirrored(target.name)
+    journal.finish_if_done()
+    print(f"Published to {target.name}")
+    return True
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 1:
+        print("Usage: python engine.py <league id>")
+        print("Leagues: " + ", ".join(league.id for league in load_leagues()))
+        return 2
+    try:
+        run_league(get_league(argv[0]))
+    finally:
+        export_metrics()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
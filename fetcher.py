@@ -0,0 +1,143 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from concurrency import http_slot
+from metrics import current
+
+# ============================================================
+# Polite HTTP Fetching
+# ============================================================
+# Every HTTP request the scrapers make (standings pages, PDFs,
+# discovery crawls) goes through one pooled session and, per
+# host, two limits:
+#
+#   HOST_MAX_CONNECTIONS — requests in flight to one host at once
+#                          (also the size of its keep-alive pool)
+#   HOST_RATE/HOST_BURST — a token bucket: on average HOST_RATE
+#                          requests a second, with up to
+#                          HOST_BURST back to back after a lull
+#
+# MAX_HTTP (concurrency.py) still caps requests across all hosts.
+# With hundreds of leagues on one site, they queue up here rather
+# than all hitting it at once.
+#
+#     with host_slot(url):
+#         response = session.get(url, ...)
+#     raise_for_status(response)
+#
+# If a host answers 429 or 503 anyway, raise_for_status() holds
+# back every request to it for its Retry-After (at most
+# HOST_MAX_PAUSE seconds) before raising as usual, so retries
+# (retry.py) don't pile straight back in. "www." is ignored, so
+# leaguesecretary.com and www.leaguesecretary.com share limits.
+# HOST_RATE=0 turns the rate limit off.
+# ============================================================
+
+HOST_RATE = float(os.getenv('HOST_RATE', 2))
+HOST_BURST = float(os.getenv('HOST_BURST', 4))
+HOST_MAX_CONNECTIONS = int(os.getenv('HOST_MAX_CONNECTIONS', 4))
+HOST_MAX_PAUSE = float(os.getenv('HOST_MAX_PAUSE', 60))
+HOST_POOLS = 16  # hosts whose keep-alive connections we hold on to
+
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self):
+        # Block until a request may go out; returns how long we waited
+        if self.rate <= 0:
+            return 0.0
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill(time.monotonic())
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def pause(self, seconds):
+        # Nothing goes out for `seconds` (the server asked us to back off)
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.tokens, 1 - seconds * self.rate)
+
+
+class Host:
+    def __init__(self, name):
+        self.name = name
+        self.bucket = TokenBucket(HOST_RATE, HOST_BURST)
+        self.slots = threading.BoundedSemaphore(HOST_MAX_CONNECTIONS)
+
+
+_hosts = {}
+_hosts_lock = threading.Lock()
+
+session = requests.Session()
+session.mount('https://', HTTPAdapter(pool_connections=HOST_POOLS, pool_maxsize=HOST_MAX_CONNECTIONS))
+session.mount('http://', HTTPAdapter(pool_connections=HOST_POOLS, pool_maxsize=HOST_MAX_CONNECTIONS))
+
+
+def host_name(url):
+    name = (urlsplit(url).hostname or '').lower()
+    return name[4:] if name.startswith('www.') else name
+
+
+def host(url):
+    name = host_name(url)
+    with _hosts_lock:
+        if name not in _hosts:
+            _hosts[name] = Host(name)
+        return _hosts[name]
+
+
+@contextmanager
+def host_slot(url):
+    # Host cap, then its rate limit, then the global cap — so a request
+    # waiting on one busy host never holds a slot others could use
+    target = host(url)
+    with target.slots:
+        waited = target.bucket.take()
+        if waited:
+            current().add('rate_wait', round(waited, 3))
+        with http_slot:
+            yield
+
+
+def retry_after(response):
+    value = response.headers.get('Retry-After', '').strip()
+    if not value:
+        return None
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def raise_for_status(response):
+    if response.status_code in (429, 503):
+        seconds = retry_after(response)
+        seconds = min(HOST_MAX_PAUSE, seconds if seconds is not None else 1 / max(HOST_RATE, 0.1))
+        print(f"{host_name(response.url)} asked us to slow down; pausing it for {seconds:.0f}s")
+        host(response.url).bucket.pause(seconds)
+    response.raise_for_status()
@@ -0,0 +1,260 @@
+import atexit
+import os
+import posixpath
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from ftplib import FTP, FTP_TLS, all_errors, error_perm, error_temp
+
+from concurrency import MAX_FTP
+from retry import FTP_RETRY
+
+# ============================================================
+# Pooled FTP Sessions
+# ============================================================
+# Logging in to the FTP host is slow, and every league used to
+# do it twice (once to check latest.pdf, once to upload). Now
+# one pool per process hands out already-logged-in connections:
+#
+#     with get_pool().session() as ftp:
+#         ftp.ensure_directory('league_pdfs/weds-mixers')
+#         ftp.storbinary(...)
+#
+# - At most MAX_FTP connections are open at once.
+# - Idle connections get a NOOP every FTP_KEEPALIVE seconds so
+#   the server doesn't drop them, and are checked before reuse.
+# - Logging in is retried (FTP_RETRY) on timeouts and 421s, and
+#   ftp.revive() reconnects (and goes back to the same folder)
+#   if the control connection died mid-job.
+# - Directories we've already seen or created are remembered,
+#   so ensure_directory() doesn't probe the server every time.
+# - FTP_TLS=1 switches to explicit FTPS, reusing the control
+#   channel's TLS session for data transfers.
+# - Transfers write FTP_BLOCK_SIZE bytes at a time, and
+#   FTP_SOCKET_BUFFER sizes their socket buffers (helps on long,
+#   fast links). What the server supports (FEAT) is asked once
+#   per pool; see archive.put_atomic for how it's used.
+# ============================================================
+
+FTP_HOST = os.getenv('FTP_HOST')
+FTP_PORT = int(os.getenv('FTP_PORT', 21))
+FTP_USERNAME = os.getenv('FTP_USERNAME')
+FTP_PASSWORD = os.getenv('FTP_PASSWORD')
+FTP_USE_TLS = os.getenv('FTP_TLS', '0') == '1'
+FTP_TIMEOUT = float(os.getenv('FTP_TIMEOUT', 30))
+FTP_KEEPALIVE = float(os.getenv('FTP_KEEPALIVE', 30))
+FTP_BLOCK_SIZE = int(os.getenv('FTP_BLOCK_SIZE', 256 * 1024))  # bytes per write on a data connection
+FTP_SOCKET_BUFFER = int(os.getenv('FTP_SOCKET_BUFFER', 0))  # SO_SNDBUF/SO_RCVBUF for transfers; 0 = OS default
+
+
+def connection_lost(error):
+    # Errors that mean the control connection itself is gone
+    if isinstance(error, (EOFError, OSError)):
+        return True
+    return isinstance(error, error_temp) and str(error).startswith('421')
+
+
+class PooledConnection:
+    def open(self, pool):
+        self.pool = pool
+        self.connect(pool.host, pool.port, timeout=FTP_TIMEOUT)
+        self.login(pool.user, pool.password)
+        if isinstance(self, FTP_TLS):
+            self.prot_p()
+        self.home = self.pwd()
+        self.current = self.home
+        self.last_used = time.monotonic()
+        pool.count_login()
+
+    def features(self):
+        # Upper-cased FEAT lines, e.g. {'SIZE', 'REST STREAM', 'HASH SHA-256*;CRC32'}
+        if self.pool.features is None:
+            try:
+                lines = self.sendcmd('FEAT').splitlines()[1:-1]
+                self.pool.features = {line.strip().upper() for line in lines if line.strip()}
+            except all_errors:
+                self.pool.features = set()
+        return self.pool.features
+
+    def has_feature(self, name):
+        return any(feature.split()[0] == name for feature in self.features())
+
+    def _tune(self, conn):
+        if FTP_SOCKET_BUFFER:
+            conn.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, FTP_SOCKET_BUFFER)
+            conn.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, FTP_SOCKET_BUFFER)
+
+    def ntransfercmd(self, cmd, rest=None):
+        conn, size = super().ntransfercmd(cmd, rest)
+        self._tune(conn)
+        return conn, size
+
+    def alive(self):
+        try:
+            self.voidcmd('NOOP')
+            return True
+        except all_errors:
+            return False
+
+    def shut(self):
+        try:
+            self.quit()
+        except all_errors:
+            self.close()
+
+    def revive(self):
+        # Reconnect if the server hung up on us, and pick up where we were
+        if self.alive():
+            return
+        print("FTP connection dropped, reconnecting...")
+        self.close()
+        where = self.current
+        self.open(self.pool)
+        if where != self.home:
+            self.cwd(where)
+            self.current = where
+
+    def _absolute(self, path):
+        return posixpath.normpath(posixpath.join(self.home, path))
+
+    def cd(self, path):
+        target = self._absolute(path)
+        if target != self.current:
+            self.cwd(target)
+            self.current = target
+
+    def ensure_directory(self, path):
+        target = self._absolute(path)
+        prefix = '/'
+        for part in target.strip('/').split('/'):
+            prefix = posixpath.join(prefix, part)
+            if prefix in self.pool.known_dirs:
+                continue
+            try:
+                self.cwd(prefix)
+            except error_perm:
+                try:
+                    self.mkd(prefix)
+                except error_perm:
+                    # Another league may have just created it; fine if so
+                    self.cwd(prefix)
+            self.current = None
+            self.pool.known_dirs.add(prefix)
+        self.cd(path)
+
+
+class PooledFTP(PooledConnection, FTP):
+    pass
+
+
+class PooledFTP_TLS(PooledConnection, FTP_TLS):
+    def ntransfercmd(self, cmd, rest=None):
+        # Many FTPS servers insist the data channel resumes the control
+        # channel's TLS session; plain FTP_TLS starts a fresh one
+        conn, size = FTP.ntransfercmd(self, cmd, rest)
+        self._tune(conn)
+        if self._prot_p:
+            conn = self.context.wrap_socket(conn, server_hostname=self.host, session=self.sock.session)
+        return conn, size
+
+
+class FTPPool:
+    def __init__(self, host, user, password, port=21, use_tls=False, size=MAX_FTP, keepalive=FTP_KEEPALIVE):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.use_tls = use_tls
+        self.keepalive = keepalive
+        self.logins = 0
+        self.known_dirs = set()
+        self.features = None  # FEAT reply, once someone has asked
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._idle = []
+        self._closed = False
+        if keepalive:
+            threading.Thread(target=self._keepalive_loop, daemon=True).start()
+
+    def count_login(self):
+        with self._lock:
+            self.logins += 1
+
+    def _connect(self):
+        # A refused login fails straight away; timeouts and 421s are retried
+        def attempt():
+            ftp = PooledFTP_TLS() if self.use_tls else PooledFTP()
+            try:
+                ftp.open(self)
+            except BaseException:
+                ftp.close()
+                raise
+            return ftp
+        return FTP_RETRY.call(attempt, what="FTP login")
+
+    def _checkout(self):
+        with self._lock:
+            ftp = self._idle.pop() if self._idle else None
+        if ftp is None:
+            return self._connect()
+        if time.monotonic() - ftp.last_used > self.keepalive and not ftp.alive():
+            ftp.close()
+            return self._connect()
+        return ftp
+
+    def _checkin(self, ftp):
+        ftp.last_used = time.monotonic()
+        with self._lock:
+            if not self._closed:
+                self._idle.append(ftp)
+                return
+        ftp.shut()
+
+    @contextmanager
+    def session(self):
+        with self._slots:
+            ftp = self._checkout()
+            try:
+                yield ftp
+            except BaseException as e:
+                if connection_lost(e):
+                    ftp.close()
+                else:
+                    self._checkin(ftp)
+                raise
+            self._checkin(ftp)
+
+    def _keepalive_loop(self):
+        while not self._closed:
+            time.sleep(self.keepalive)
+            with self._lock:
+                stale = [ftp for ftp in self._idle if time.monotonic() - ftp.last_used >= self.keepalive]
+                for ftp in stale:
+                    self._idle.remove(ftp)
+            for ftp in stale:
+                if ftp.alive():
+                    self._checkin(ftp)
+                else:
+                    ftp.close()
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for ftp in idle:
+            ftp.shut()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    # One shared pool per process, logged in with the FTP_* settings
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = FTPPool(FTP_HOST, FTP_USERNAME, FTP_PASSWORD, port=FTP_PORT, use_tls=FTP_USE_TLS)
+            atexit.register(_pool.close)
+        return _pool
@@ -0,0 +1,153 @@
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+from contextlib import closing
+from datetime import datetime, timedelta, timezone
+
+from state import state_path
+
+# ============================================================
+# Standings History
+# ============================================================
+# Every new snapshot a league publishes is added to a local
+# SQLite database (state/history.sqlite3): the PDF's hash, when
+# we fetched it, and the standings rows read out of it (see
+# standings.py). Nothing is ever rebuilt — each run only inserts
+# the snapshot it just published.
+#
+# Questions that used to mean opening every archived PDF are now
+# an indexed query:
+#
+#   python history.py team "Strike Force"      points over the season
+#   python history.py changed --days 7         leagues that changed
+#   python history.py snapshots weds-mixers    one league's history
+# ============================================================
+
+HISTORY_DB = os.getenv('HISTORY_DB', state_path('history.sqlite3'))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY,
+    league TEXT NOT NULL,
+    sha256 TEXT NOT NULL,
+    standings TEXT,
+    fetched_at TEXT NOT NULL,
+    day TEXT NOT NULL,
+    source_url TEXT,
+    filename TEXT,
+    UNIQUE (league, sha256)
+);
+CREATE TABLE IF NOT EXISTS standings_rows (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots(id),
+    league TEXT NOT NULL,
+    day TEXT NOT NULL,
+    place INTEGER,
+    team TEXT NOT NULL,
+    row_values TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS snapshots_league_day ON snapshots (league, day);
+CREATE INDEX IF NOT EXISTS snapshots_day ON snapshots (day);
+CREATE INDEX IF NOT EXISTS rows_team ON standings_rows (team COLLATE NOCASE, day);
+CREATE INDEX IF NOT EXISTS rows_league_team ON standings_rows (league, team, day);
+"""
+
+_lock = threading.Lock()
+
+
+def connect(path=HISTORY_DB):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    db = sqlite3.connect(path, timeout=30)
+    db.execute('PRAGMA journal_mode=WAL')
+    db.executescript(SCHEMA)
+    return db
+
+
+def record_snapshot(league, stored, rows, source_url=None, filename=None, standings=None):
+    # Add one published snapshot; returns False if we already had it
+    now = datetime.now(timezone.utc)
+    with _lock, closing(connect()) as db, db:
+        cursor = db.execute(
+            'INSERT OR IGNORE INTO snapshots (league, sha256, standings, fetched_at, day, source_url, filename) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (league, stored.sha256, standings, now.isoformat(timespec='seconds'), now.date().isoformat(),
+             source_url, filename),
+        )
+        if not cursor.rowcount:
+            return False
+        db.executemany(
+            'INSERT INTO standings_rows (snapshot_id, league, day, place, team, row_values) VALUES (?, ?, ?, ?, ?, ?)',
+            [(cursor.lastrowid, league, now.date().isoformat(), row['place'], row['team'], json.dumps(row['values']))
+             for row in rows or []],
+        )
+    return True
+
+
+def team_history(team, league=None):
+    query = ('SELECT league, day, place, row_values FROM standings_rows '
+             'WHERE team = ? COLLATE NOCASE')
+    params = [team]
+    if league:
+        query += ' AND league = ?'
+        params.append(league)
+    query += ' ORDER BY league, day'
+    with closing(connect()) as db:
+        return [(league, day, place, json.loads(values)) for league, day, place, values in db.execute(query, params)]
+
+
+def change_times(league, days=56):
+    # When each of this league's snapshots was fetched, oldest first
+    since = (datetime.now(timezone.utc).date() - timedelta(days=days)).isoformat()
+    with closing(connect()) as db:
+        rows = db.execute('SELECT fetched_at FROM snapshots WHERE league = ? AND day >= ? ORDER BY fetched_at',
+                          (league, since)).fetchall()
+    return [datetime.fromisoformat(fetched_at) for fetched_at, in rows]
+
+
+def changed_since(days=7):
+    since = (datetime.now(timezone.utc).date() - timedelta(days=days)).isoformat()
+    with closing(connect()) as db:
+        return db.execute(
+            'SELECT league, COUNT(*), MAX(fetched_at) FROM snapshots WHERE day >= ? GROUP BY league ORDER BY league',
+            (since,),
+        ).fetchall()
+
+
+def snapshots(league):
+    with closing(connect()) as db:
+        return db.execute(
+            'SELECT s.fetched_at, s.sha256, s.filename, COUNT(r.snapshot_id) FROM snapshots s '
+            'LEFT JOIN standings_rows r ON r.snapshot_id = s.id WHERE s.league = ? '
+            'GROUP BY s.id ORDER BY s.fetched_at',
+            (league,),
+        ).fetchall()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query the standings history.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    team = commands.add_parser('team', help="a team's standings over time")
+    team.add_argument('name')
+    team.add_argument('--league')
+    changed = commands.add_parser('changed', help="leagues with new standings recently")
+    changed.add_argument('--days', type=int, default=7)
+    league = commands.add_parser('snapshots', help="every snapshot of one league")
+    league.add_argument('league')
+    args = parser.parse_args(argv)
+
+    if args.command == 'team':
+        for league_id, day, place, values in team_history(args.name, args.league):
+            print(f"{day}  {league_id:<28} {place if place is not None else '-':>3}  {' '.join(values)}")
+    elif args.command == 'changed':
+        for league_id, count, last in changed_since(args.days):
+            print(f"{league_id:<28} {count} new snapshot(s), last {last}")
+    else:
+        for fetched_at, sha256, filename, row_count in snapshots(args.league):
+            print(f"{fetched_at}  {sha256[:12]}  {filename or '-'}  {row_count} rows")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,153 @@
+import argparse
+import hashlib
+import os
+import shutil
+import time
+
+from fetcher import session, raise_for_status
+from pdf_store import StoredPDF, stream_to_file
+from state import state_path, load_json, save_json
+
+# ============================================================
+# Conditional-GET Cache
+# ============================================================
+# Keeps the last copy of each polled URL on disk along with the
+# ETag / Last-Modified the server sent. The next request sends
+# them back (If-None-Match / If-Modified-Since); if the file
+# hasn't changed the server answers 304 with no body, and the
+# caller can skip everything downstream.
+#
+# Validators are only sent once the caller confirm()s that the
+# copy it got was fully processed — otherwise a run that died
+# halfway would get 304s forever and never finish the job.
+#
+# Bodies are streamed straight into the cache (see pdf_store.py),
+# so callers get a StoredPDF pointing at the cached file.
+#
+# The cache lives in state/http_cache and is kept under
+# HTTP_CACHE_MAX_MB / HTTP_CACHE_MAX_ENTRIES by evicting the
+# least recently used entries. Clear it with:
+#     python http_cache.py --purge
+# ============================================================
+
+CACHE_DIR = state_path('http_cache')
+MAX_BYTES = int(float(os.getenv('HTTP_CACHE_MAX_MB', 50)) * 1024 * 1024)
+MAX_ENTRIES = int(os.getenv('HTTP_CACHE_MAX_ENTRIES', 100))
+
+class CachedResponse:
+    def __init__(self, url, stored, not_modified):
+        self.url = url
+        self.stored = stored
+        self.not_modified = not_modified
+
+
+def _key(url):
+    return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+
+def _meta_path(url):
+    return os.path.join(CACHE_DIR, f'{_key(url)}.json')
+
+
+def _body_path(url):
+    return os.path.join(CACHE_DIR, f'{_key(url)}.body')
+
+
+def _validators(meta):
+    headers = {}
+    if meta.get('etag'):
+        headers['If-None-Match'] = meta['etag']
+    if meta.get('last_modified'):
+        headers['If-Modified-Since'] = meta['last_modified']
+    return headers
+
+
+def conditional_get(url, timeout=10):
+    meta = load_json(_meta_path(url)) or {}
+    headers = {}
+    if meta.get('confirmed') and os.path.exists(_body_path(url)):
+        headers = _validators(meta)
+
+    with session.get(url, headers=headers, timeout=timeout, stream=True) as response:
+        if response.status_code == 304 and headers:
+            os.utime(_body_path(url))  # mark as recently used for eviction
+            stored = StoredPDF(_body_path(url), meta.get('sha256'), meta.get('size'), url)
+            return CachedResponse(url, stored, not_modified=True)
+
+        raise_for_status(response)
+        return CachedResponse(url, store(url, response), not_modified=False)
+
+
+def store(url, response):
+    stored = stream_to_file(response, CACHE_DIR, dest_path=_body_path(url))
+    save_json(_meta_path(url), {
+        'url': url,
+        'etag': response.headers.get('ETag'),
+        'last_modified': response.headers.get('Last-Modified'),
+        'sha256': stored.sha256,
+        'size': stored.size,
+        'stored_at': time.time(),
+        'confirmed': False,
+    })
+    evict(keep=stored.path)
+    return stored
+
+
+def confirm(url):
+    meta = load_json(_meta_path(url))
+    if meta and not meta.get('confirmed'):
+        meta['confirmed'] = True
+        save_json(_meta_path(url), meta)
+
+
+def _entries():
+    if not os.path.isdir(CACHE_DIR):
+        return []
+    entries = []
+    for name in os.listdir(CACHE_DIR):
+        if name.endswith('.body'):
+            path = os.path.join(CACHE_DIR, name)
+            stat = os.stat(path)
+            entries.append((stat.st_mtime, stat.st_size, path))
+    return sorted(entries)
+
+
+def _remove(body_path):
+    for path in (body_path, body_path[:-len('.body')] + '.json'):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def evict(keep=None):
+    # Drop least recently used entries until we're under both limits
+    entries = _entries()
+    total = sum(size for _, size, _ in entries)
+    count = len(entries)
+    entries = [entry for entry in entries if entry[2] != keep]
+    while entries and (total > MAX_BYTES or count > MAX_ENTRIES):
+        _, size, path = entries.pop(0)
+        _remove(path)
+        total -= size
+        count -= 1
+
+
+def purge():
+    shutil.rmtree(CACHE_DIR, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Inspect or clear the HTTP cache.")
+    parser.add_argument('--purge', action='store_true', help="delete every cached response")
+    args = parser.parse_args()
+
+    if args.purge:
+        purge()
+        print(f"Purged {CACHE_DIR}")
+    else:
+        entries = _entries()
+        print(f"{len(entries)} entries, {sum(size for _, size, _ in entries) / 1024:.0f} KiB in {CACHE_DIR}")
+        for _, size, path in reversed(entries):
+            meta = load_json(path[:-len('.body')] + '.json') or {}
+            print(f"  {size / 1024:8.0f} KiB  {meta.get('url', '?')}")
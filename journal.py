@@ -0,0 +1,173 @@
+import hashlib
+import os
+import re
+from datetime import datetime, timezone
+
+from pdf_store import CHUNK_SIZE, StoredPDF
+from state import state_path, load_json, update_json
+
+# ============================================================
+# Per-League Step Journal
+# ============================================================
+# Publishing a new PDF is several steps, any of which a crash or
+# a killed runner can interrupt:
+#
+#   fetched          downloaded, and it's news
+#   stored           kept under state/journal until we're done
+#   uploaded-dated   archived object + standings_<date>.html
+#   uploaded-latest  latest.html (+ latest.pdf's redirect) + manifest.json
+#   notified         email queued in the outbox (notifier.py)
+#
+# Those are for the primary publish target; each mirror target
+# (publishers.py) is ticked off separately once it has the lot.
+#
+# Each league has one journal file, state/journal/<league>.json,
+# for the PDF it's currently publishing (keyed by its SHA-256),
+# and every step is written down as soon as it's done. The next
+# run finds an unfinished entry, picks up at the first step that
+# isn't recorded and skips the rest — so a crash after the
+# manifest went up can no longer swallow the email, and one
+# before it doesn't redo the uploads.
+#
+# The PDF itself is kept next to the journal, as
+# state/journal/<league>-<sha256>.pdf, until the entry is finished
+# (notified, and on every mirror), since pdfs/ doesn't outlive a
+# run. Naming it by hash means a newer PDF never replaces the
+# bytes under a mirror job that's still publishing an older one;
+# sweep() clears out superseded copies once no job needs them.
+#
+# All of this only works if state/ is kept between runs, including
+# failed ones: 'notified' and the manifest are written before the
+# email actually goes out, so a run whose state is thrown away can
+# lose that email for good. The GitHub workflow saves state/ with
+# if: always() for that reason; anywhere else, keep STATE_DIR on
+# persistent storage (the Docker image makes it a volume).
+# ============================================================
+
+STEPS = ('fetched', 'stored', 'uploaded-dated', 'uploaded-latest', 'notified')
+
+JOURNAL_DIR = state_path('journal')
+KEPT_PDF = re.compile(r'^(?P<league>.+)-(?P<sha256>[0-9a-f]{64})\.pdf$')
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat(timespec='seconds')
+
+
+class Journal:
+    # Every change goes through update_json() and only applies while the
+    # file is still about our PDF, so a mirror job finishing late can't
+    # clobber the entry for a newer one
+    def __init__(self, league_id):
+        self.league_id = league_id
+        self.path = os.path.join(JOURNAL_DIR, f'{league_id}.json')
+        self.entry = load_json(self.path) or {}
+
+    @property
+    def pdf_path(self):
+        # Where the pending entry's PDF is kept
+        return os.path.join(JOURNAL_DIR, f"{self.league_id}-{self.entry.get('sha256')}.pdf")
+
+    def pending(self):
+        # The unfinished entry from an earlier run, if there is one
+        entry = self.entry
+        if entry.get('sha256') and not entry.get('finished'):
+            return entry
+        return None
+
+    def next_step(self):
+        # None once only mirrors (if any) are left
+        steps = self.entry.get('steps', {})
+        return next((step for step in STEPS if step not in steps), None)
+
+    def has(self, step):
+        return step in self.entry.get('steps', {})
+
+    def missing_mirrors(self):
+        return sorted(name for name, done in self.entry.get('mirrors', {}).items() if not done)
+
+    def _update(self, fn):
+        sha256 = self.entry.get('sha256')
+
+        def apply(entry):
+            entry = entry or {}
+            if entry.get('sha256') == sha256:
+                fn(entry)
+            return entry
+        self.entry = update_json(self.path, apply, {})
+
+    def start(self, stored, mirrors=(), **details):
+        # A new PDF to publish; whatever was here before is superseded
+        entry = dict(details, sha256=stored.sha256, size=stored.size, steps={'fetched': _now()},
+                     mirrors={name: None for name in mirrors})
+        self.entry = update_json(self.path, lambda _: entry, {})
+
+    def done(self, step, **details):
+        if step not in STEPS:
+            raise ValueError(f"Unknown journal step '{step}'")
+
+        def record(entry):
+            entry.update(details)
+            entry.setdefault('steps', {})[step] = _now()
+        self._update(record)
+
+    def mirrored(self, name):
+        def record(entry):
+            entry.setdefault('mirrors', {})[name] = _now()
+        self._update(record)
+
+    def keep(self, stored):
+        # Hold on to the bytes until every step is done
+        kept = stored.link_to(self.pdf_path)
+        self.done('stored')
+        return kept
+
+    def stored(self):
+        # The kept PDF for the pending entry, or None if it's gone or damaged
+        digest = hashlib.sha256()
+        try:
+            with open(self.pdf_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                    digest.update(chunk)
+        except OSError:
+            return None
+        if digest.hexdigest() != self.entry['sha256']:
+            return None
+        return StoredPDF(self.pdf_path, self.entry['sha256'], self.entry['size'], self.entry.get('source_url'))
+
+    def finish_if_done(self):
+        # Once the email is queued and every mirror has it, let the PDF go
+        pdf_path = self.pdf_path
+
+        def record(entry):
+            if 'notified' in entry.get('steps', {}) and all(entry.get('mirrors', {}).values()):
+                entry.setdefault('finished', _now())
+                try:
+                    os.remove(pdf_path)
+                except FileNotFoundError:
+                    pass
+        self._update(record)
+
+    def sweep(self):
+        # Drop kept PDFs of entries a newer one has replaced. Only call this
+        # while no mirror job for the league is running: one might still be
+        # reading such a file.
+        current = self.entry.get('sha256') if self.pending() else None
+        try:
+            names = os.listdir(JOURNAL_DIR)
+        except FileNotFoundError:
+            return
+        for name in names:
+            match = KEPT_PDF.match(name)
+            if match and match.group('league') == self.league_id and match.group('sha256') != current:
+                try:
+                    os.remove(os.path.join(JOURNAL_DIR, name))
+                except FileNotFoundError:
+                    pass
+
+    def abandon(self, reason):
+        print(f"Giving up on unfinished publish of {self.entry.get('sha256', '?')[:12]}: {reason}")
+
+        def clear(entry):
+            entry.clear()
+        self._update(clear)
@@ -0,0 +1,119 @@
+import hashlib
+import io
+import json
+import posixpath
+import re
+from datetime import datetime, timezone
+
+from state import state_path, load_json, save_json
+
+# ============================================================
+# Change Detection Manifests
+# ============================================================
+# Instead of pulling latest.pdf down on every run just to compare
+# bytes, each league folder on every publish target carries a
+# tiny manifest.json describing what latest.pdf is:
+#
+#     {"sha256": ..., "size": ..., "source_url": ..., "updated_at": ...,
+#      "object": "../objects/3f/3f9c...e1.pdf", "standings": ...}
+#
+# "standings" is the digest of the table rows (see standings.py),
+# so a re-export with identical standings isn't a change.
+#
+# It doubles as the machine-readable "latest" pointer into the
+# content-addressed archive (see archive.py).
+#
+# Changes are checked against the primary target only. A copy of
+# its manifest is kept locally in state/manifests/<league>.json
+# along with the stamp (e.g. SIZE/MDTM on FTP) the target reported
+# for manifest.json when we last saw it. Checking then goes:
+#
+#   1. the stamp of manifest.json matches what we saved
+#        → trust the local copy (no file transfer at all)
+#   2. otherwise fetch manifest.json (a few hundred bytes)
+#   3. manifest missing or unreadable
+#        → hash latest.pdf as it streams in (old behaviour, once)
+# ============================================================
+
+MANIFEST_NAME = 'manifest.json'
+SHA256_HEX = re.compile(r'^[0-9a-f]{64}$')
+
+
+def local_manifest_path(league):
+    return state_path('manifests', f'{league}.json')
+
+
+def build_manifest(sha256, size, source_url, filename, object_path=None, standings=None):
+    return {
+        'sha256': sha256,
+        'size': size,
+        'source_url': source_url,
+        'filename': filename,
+        'object': object_path,
+        'standings': standings,
+        'updated_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+    }
+
+
+def is_valid(manifest):
+    return (
+        isinstance(manifest, dict)
+        and isinstance(manifest.get('sha256'), str)
+        and SHA256_HEX.match(manifest['sha256']) is not None
+        and isinstance(manifest.get('size'), int)
+    )
+
+
+def fetch_remote_manifest(target, path):
+    buffer = io.BytesIO()
+    if not target.read(path, buffer.write):
+        return None
+    try:
+        manifest = json.loads(buffer.getvalue().decode('utf-8'))
+    except ValueError:
+        return None
+    return manifest if is_valid(manifest) else None
+
+
+def hash_remote_file(target, path):
+    digest = hashlib.sha256()
+    if not target.read(path, digest.update):
+        return None
+    return digest.hexdigest()
+
+
+def remote_manifest(target, league_dir, league, fallback_file='latest.pdf'):
+    # Manifest of what's currently published for this league (at least
+    # its sha256), or None if nothing is. `target` is a session on the
+    # primary publish target (see publishers.py).
+    local = load_json(local_manifest_path(league))
+    path = posixpath.join(league_dir, MANIFEST_NAME)
+    stamp = target.stamp(path)
+
+    if stamp and is_valid(local) and local.get('remote_stamp') == stamp:
+        print("manifest.json unchanged on the primary target, using local copy.")
+        return local
+
+    manifest = fetch_remote_manifest(target, path)
+    if manifest:
+        print("Fetched manifest.json from the primary target.")
+        manifest['remote_stamp'] = stamp
+        save_json(local_manifest_path(league), manifest)
+        return manifest
+
+    print(f"No usable manifest published, hashing {fallback_file} instead...")
+    sha256 = hash_remote_file(target, posixpath.join(league_dir, fallback_file))
+    return {'sha256': sha256} if sha256 else None
+
+
+def publish_manifest(target, league_dir, league, manifest, remember=True):
+    # Upload manifest.json next to the PDFs. For the primary target,
+    # remember what it says about the file so the next run can skip
+    # fetching it.
+    path = posixpath.join(league_dir, MANIFEST_NAME)
+    payload = json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8')
+    target.write(path, io.BytesIO(payload))
+    if remember:
+        local = dict(manifest, remote_stamp=target.stamp(path))
+        save_json(local_manifest_path(league), local)
+    print(f"Updated {path}.")
@@ -0,0 +1,239 @@
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from functools import wraps
+
+from state import state_path
+
+# ============================================================
+# Stage Timings and Run Metrics
+# ============================================================
+# Each stage of a league's run (browser launch, resolve,
+# download, FTP compare, upload, email) is timed as a span:
+#
+#     @stage('download')
+#     def download_pdf(url): ...
+#
+#     current().add('bytes', stored.size)   # inside the stage
+#
+# A span records its duration, its outcome (ok / the error's
+# type), the league it ran for, and any counters added along the
+# way; retry.py counts retries into whichever span is running.
+# Spans nest (upload runs inside publish, browser inside
+# resolve), and each records the stage it ran inside as parent.
+#
+# Every finished span is appended to METRICS_JSONL as one JSON
+# line, and export() writes METRICS_PROM in Prometheus textfile
+# format (for node_exporter's textfile collector). The JSONL file
+# is rotated once it passes METRICS_JSONL_MAX_MB. The run
+# summary's per-league breakdown comes from here too.
+#
+# METRICS=0 turns it all off; stages then cost one attribute
+# lookup and a function call.
+# ============================================================
+
+ENABLED = os.getenv('METRICS', '1') == '1'
+METRICS_JSONL = os.getenv('METRICS_JSONL', state_path('metrics', 'spans.jsonl'))
+METRICS_PROM = os.getenv('METRICS_PROM', state_path('metrics', 'scraper.prom'))
+METRICS_JSONL_MAX_BYTES = int(float(os.getenv('METRICS_JSONL_MAX_MB', 5)) * 1024 * 1024)
+
+RUN_ID = uuid.uuid4().hex[:12]
+
+_local = threading.local()
+_lock = threading.Lock()
+_spans = []
+
+
+class Span:
+    def __init__(self, name, league=None, parent=None):
+        self.name = name
+        self.league = league
+        self.parent = parent
+        self.counters = {}
+        self.outcome = 'ok'
+        self.error = None
+        self.started = time.time()
+        self.seconds = None
+
+    def add(self, key, amount=1):
+        self.counters[key] = self.counters.get(key, 0) + amount
+
+    def set(self, key, value):
+        self.counters[key] = value
+
+    def record(self):
+        entry = {
+            'run': RUN_ID,
+            'ts': round(self.started, 3),
+            'league': self.league,
+            'stage': self.name,
+            'parent': self.parent,
+            'seconds': round(self.seconds, 4),
+            'outcome': self.outcome,
+        }
+        if self.error:
+            entry['error'] = self.error
+        entry.update(self.counters)
+        return entry
+
+
+class _NoSpan:
+    # Stands in for a span when metrics are off or nothing is running
+    def add(self, key, amount=1):
+        pass
+
+    def set(self, key, value):
+        pass
+
+
+NO_SPAN = _NoSpan()
+
+
+def _stack():
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+def current():
+    stack = getattr(_local, 'stack', None)
+    return stack[-1] if stack else NO_SPAN
+
+
+@contextmanager
+def span(name, league=None):
+    if not ENABLED:
+        yield NO_SPAN
+        return
+    stack = _stack()
+    if league is None and stack:
+        league = stack[-1].league
+    current_span = Span(name, league, stack[-1].name if stack else None)
+    stack.append(current_span)
+    start = time.perf_counter()
+    try:
+        yield current_span
+    except BaseException as e:
+        current_span.outcome = type(e).__name__
+        current_span.error = str(e)[:200]
+        raise
+    finally:
+        current_span.seconds = time.perf_counter() - start
+        stack.pop()
+        _finish(current_span)
+
+
+def stage(name):
+    # Decorator form of span() for a whole stage function
+    def decorate(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return fn(*args, **kwargs)
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def _finish(finished):
+    entry = finished.record()
+    with _lock:
+        _spans.append(entry)
+        try:
+            os.makedirs(os.path.dirname(METRICS_JSONL) or '.', exist_ok=True)
+            with open(METRICS_JSONL, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, sort_keys=True) + '\n')
+        except OSError as e:
+            print(f"Could not write metrics to {METRICS_JSONL}: {e}")
+
+
+def _rotate_jsonl():
+    # Keep one previous file around so the state cache doesn't grow forever
+    try:
+        if os.path.getsize(METRICS_JSONL) > METRICS_JSONL_MAX_BYTES:
+            os.replace(METRICS_JSONL, f'{METRICS_JSONL}.1')
+    except OSError:
+        pass
+
+
+def new_run():
+    # Start a fresh set of spans (daemon mode runs many rounds per process)
+    global RUN_ID
+    with _lock:
+        RUN_ID = uuid.uuid4().hex[:12]
+        _spans.clear()
+
+
+def spans():
+    with _lock:
+        return list(_spans)
+
+
+def breakdown():
+    # {league: {stage: seconds}} for this run, stages in first-seen order.
+    # Only the stages run directly inside the league span: nested ones are
+    # already part of their parent's time, so these never add up to more
+    # than the league took.
+    result = {}
+    for entry in spans():
+        if entry['league'] and entry.get('parent') == 'league':
+            stages = result.setdefault(entry['league'], {})
+            stages[entry['stage']] = stages.get(entry['stage'], 0) + entry['seconds']
+    return result
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    parts = [f'{key}="{_escape(value)}"' for key, value in labels.items() if value is not None]
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def export(path=METRICS_PROM):
+    # Prometheus textfile with this run's totals per league and stage
+    if not ENABLED:
+        return
+    totals = {}
+    for entry in spans():
+        key = (entry['league'], entry['stage'])
+        total = totals.setdefault(key, {'seconds': 0.0, 'count': 0, 'errors': 0, 'bytes': 0, 'retries': 0})
+        total['seconds'] += entry['seconds']
+        total['count'] += 1
+        total['errors'] += entry['outcome'] != 'ok'
+        total['bytes'] += entry.get('bytes', 0)
+        total['retries'] += entry.get('retries', 0)
+
+    lines = [
+        '# HELP scraper_stage_seconds Time spent in each stage during the last run.',
+        '# TYPE scraper_stage_seconds gauge',
+    ]
+    lines += [f'scraper_stage_seconds{_labels(league=league, stage=name)} {total["seconds"]:.4f}'
+              for (league, name), total in sorted(totals.items(), key=str)]
+    for metric, field, help_text in [
+        ('scraper_stage_runs', 'count', 'Times each stage ran during the last run.'),
+        ('scraper_stage_errors', 'errors', 'Stage runs that ended in an error during the last run.'),
+        ('scraper_stage_bytes', 'bytes', 'Bytes transferred by each stage during the last run.'),
+        ('scraper_stage_retries', 'retries', 'Retries made by each stage during the last run.'),
+    ]:
+        lines += [f'# HELP {metric} {help_text}', f'# TYPE {metric} gauge']
+        lines += [f'{metric}{_labels(league=league, stage=name)} {total[field]}'
+                  for (league, name), total in sorted(totals.items(), key=str)]
+    lines += [
+        '# HELP scraper_last_run_timestamp_seconds When the last run finished.',
+        '# TYPE scraper_last_run_timestamp_seconds gauge',
+        f'scraper_last_run_timestamp_seconds {time.time():.0f}',
+    ]
+
+    _rotate_jsonl()
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
+    os.replace(tmp_path, path)
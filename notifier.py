@@ -0,0 +1,197 @@
+import glob
+import os
+import smtplib
+import threading
+import time
+import uuid
+from email.mime.text import MIMEText
+
+from metrics import stage, current
+from retry import SMTP_RETRY
+from state import state_path, load_json, save_json
+
+# ============================================================
+# Batched Email Notifications
+# ============================================================
+# Leagues don't send their own emails any more; they add() a
+# change event here, and flush() sends everything at the end of
+# the run over ONE authenticated SMTP connection.
+#
+# Who gets what comes from subscribers.json (SUBSCRIBERS_FILE):
+#
+#     [
+#       {"email": "jeff@example.com", "leagues": "*"},
+#       {"email": "pat@example.com",  "leagues": ["weds-mixers"]}
+#     ]
+#
+# Each subscriber gets one message covering just their leagues —
+# the league's usual email if only one changed, a digest if
+# several did. Without a subscribers file, EMAIL_TO gets them all.
+#
+# Nothing is lost if sending fails: events are written to the
+# outbox (state/outbox) the moment they're added, and messages
+# stay there until the server accepts them, so whatever didn't
+# go out is retried on the next run — provided that run gets this
+# run's state/. A failed send fails the run, so state/ has to be
+# kept even then (the GitHub workflow saves it with if: always()).
+#
+# SMTP_STARTTLS=0 and an empty SMTP_USER let this talk to a
+# plain local SMTP stand-in for testing.
+# ============================================================
+
+EMAIL_FROM = os.getenv('EMAIL_FROM')
+EMAIL_TO = os.getenv('EMAIL_TO')
+SMTP_SERVER = os.getenv('SMTP_SERVER')
+SMTP_PORT = int(os.getenv('SMTP_PORT', 587))
+SMTP_USER = os.getenv('SMTP_USER')
+SMTP_PASS = os.getenv('SMTP_PASS')
+SMTP_STARTTLS = os.getenv('SMTP_STARTTLS', '1') == '1'
+SMTP_TIMEOUT = float(os.getenv('SMTP_TIMEOUT', 30))
+SMTP_MIN_INTERVAL = float(os.getenv('SMTP_MIN_INTERVAL', 1))  # seconds between messages
+SUBSCRIBERS_FILE = os.getenv('SUBSCRIBERS_FILE', 'subscribers.json')
+
+OUTBOX_DIR = state_path('outbox')
+
+
+def load_subscribers():
+    subscribers = load_json(SUBSCRIBERS_FILE)
+    if subscribers:
+        return subscribers
+    return [{'email': EMAIL_TO, 'leagues': '*'}] if EMAIL_TO else []
+
+
+def follows(subscriber, league):
+    leagues = subscriber.get('leagues', '*')
+    return leagues == '*' or league in leagues
+
+
+def build_message(events):
+    if len(events) == 1:
+        return events[0]['subject'], events[0]['body']
+    subject = "New League PDFs Posted: " + ", ".join(event['title'] for event in events)
+    body = "\n\n".join(event['body'] for event in events)
+    return subject, body
+
+
+class Notifier:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self._server = None
+        self._last_sent = 0
+
+    def add(self, league, title, subject, body):
+        event = {'league': league, 'title': title, 'subject': subject, 'body': body, 'at': time.time()}
+        save_json(os.path.join(OUTBOX_DIR, f'event-{time.time():.6f}-{uuid.uuid4().hex[:8]}.json'), event)
+        print(f"Queued notification: {subject}")
+
+    def _plan(self):
+        # Turn pending events into per-subscriber messages in the outbox;
+        # returns how many events had to stay put for want of anyone to send to
+        event_paths = sorted(glob.glob(os.path.join(OUTBOX_DIR, 'event-*.json')))
+        events = [load_json(path) for path in event_paths]
+        events = [event for event in events if event]
+        subscribers = load_subscribers()
+        if events and not subscribers:
+            print(f"No one to notify (no {SUBSCRIBERS_FILE} and EMAIL_TO isn't set); "
+                  f"keeping {len(events)} notification(s) in {OUTBOX_DIR}.")
+            return len(events)
+        for subscriber in subscribers:
+            theirs = [event for event in events if follows(subscriber, event['league'])]
+            if not theirs:
+                continue
+            subject, body = build_message(theirs)
+            save_json(os.path.join(OUTBOX_DIR, f'message-{time.time():.6f}-{uuid.uuid4().hex[:8]}.json'),
+                      {'to': subscriber['email'], 'subject': subject, 'body': body, 'attempts': 0})
+        for path in event_paths:
+            os.remove(path)
+        return 0
+
+    @staticmethod
+    def _connect():
+        server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT, timeout=SMTP_TIMEOUT)
+        if SMTP_STARTTLS:
+            server.starttls()
+        if SMTP_USER:
+            server.login(SMTP_USER, SMTP_PASS)
+        return server
+
+    @staticmethod
+    def _mime(message):
+        msg = MIMEText(message['body'])
+        msg['Subject'] = message['subject']
+        msg['From'] = EMAIL_FROM
+        msg['To'] = message['to']
+        return msg.as_string()
+
+    def _send(self, message):
+        if self._server is None:
+            self._server = self._connect()
+        wait = SMTP_MIN_INTERVAL - (time.monotonic() - self._last_sent)
+        if wait > 0:
+            time.sleep(wait)
+        self._server.sendmail(EMAIL_FROM, [message['to']], self._mime(message))
+        self._last_sent = time.monotonic()
+
+    def _drop_connection(self, error=None):
+        if isinstance(error, smtplib.SMTPResponseException):
+            return  # the server answered, so the connection is still good
+        server, self._server = self._server, None
+        if server is not None:
+            try:
+                server.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+
+    @stage('notify')
+    def flush(self):
+        # Send everything in the outbox; returns how many messages didn't go out
+        with self._lock:
+            unplanned = self._plan()
+            message_paths = sorted(glob.glob(os.path.join(OUTBOX_DIR, 'message-*.json')))
+            if not message_paths:
+                return unplanned
+
+            print(f"Sending {len(message_paths)} notification email(s)...")
+            self.failed = 0
+            self.dropped = 0
+            try:
+                for path in message_paths:
+                    message = load_json(path)
+                    if not message:
+                        os.remove(path)
+                        continue
+                    try:
+                        SMTP_RETRY.call(self._send, message, on_retry=self._drop_connection,
+                                        what=f"Email to {message['to']}")
+                    except smtplib.SMTPAuthenticationError:
+                        # Retrying won't fix bad credentials; keep the rest for next run
+                        raise
+                    except smtplib.SMTPRecipientsRefused as e:
+                        # Permanent for this address; don't keep retrying it
+                        print(f"Server refused {message['to']}, dropping message: {e}")
+                        os.remove(path)
+                        self.dropped += 1
+                        continue
+                    except (smtplib.SMTPException, OSError) as e:
+                        print(f"Giving up on email to {message['to']} for this run: {e}")
+                        self._drop_connection(e)
+                        message['attempts'] = message.get('attempts', 0) + 1
+                        save_json(path, message)
+                        self.failed += 1
+                        continue
+                    os.remove(path)
+                    self.sent += 1
+                    current().add('messages')
+                    print(f"Notification email sent to {message['to']}.")
+            except smtplib.SMTPAuthenticationError as e:
+                print(f"SMTP login failed: {e}")
+                self.failed = len(glob.glob(os.path.join(OUTBOX_DIR, 'message-*.json')))
+            finally:
+                self._drop_connection()
+
+            if self.failed:
+                print(f"{self.failed} notification(s) left in {OUTBOX_DIR} for the next run.")
+            return self.failed + self.dropped + unplanned
@@ -0,0 +1,148 @@
+import re
+import time
+from urllib.parse import urljoin
+
+import requests
+
+from fetcher import session, host_slot, raise_for_status
+from retry import HTTP_RETRY, clip
+from state import state_path, load_json, update_json
+
+# ============================================================
+# PDF URL Resolver
+# ============================================================
+# The customExport button on a standings page just points the
+# browser at the league's PDF. Most of the time we can find that
+# URL by fetching the page over plain HTTP and reading it out of
+# the HTML, which takes milliseconds instead of a Chrome launch.
+#
+# Strategies are tried in order until one returns a URL:
+#   export-link   — the href/data-*/onclick/form on #customExport
+#   embedded-pdf  — a .pdf link anywhere in the page source
+#   browser       — the old Selenium click-through (fallback);
+#                   this one may hand back the PDF itself (a
+#                   StoredPDF) instead of just its URL
+#
+# Whichever HTTP strategy wins is remembered per league in
+# state/resolver_strategies.json and tried first next run. The
+# browser is never remembered and always goes last, so one bad
+# page fetch doesn't pin a league to Chrome. If the page itself
+# can't be fetched, the other HTTP strategy (which would need
+# the same page) is skipped and the browser goes straight away.
+# ============================================================
+
+STRATEGIES_FILE = state_path('resolver_strategies.json')
+HTTP_STRATEGIES = ['export-link', 'embedded-pdf']
+HTTP_TIMEOUT = 10
+
+# Attributes a button/link might carry its target in
+URL_ATTRS = ['href', 'data-url', 'data-href', 'data-export-url', 'formaction', 'action']
+URL_IN_JS = re.compile(r"""['"]((?:https?://|/)[^'"\s]+)['"]""")
+PDF_IN_PAGE = re.compile(r"""[^'"\s<>()=]+\.pdf\b""", re.IGNORECASE)
+
+def fetch_page(url):
+    def attempt():
+        with host_slot(url):
+            response = session.get(url, timeout=clip(HTTP_TIMEOUT))
+        raise_for_status(response)
+        return response.text
+    return HTTP_RETRY.call(attempt, what="Standings page")
+
+
+def looks_like_pdf(url):
+    if url.lower().split('?')[0].endswith('.pdf'):
+        return url
+    # An export endpoint that isn't named .pdf — ask the server what it is
+    try:
+        with host_slot(url):
+            response = session.head(url, timeout=HTTP_TIMEOUT, allow_redirects=True)
+        if 'pdf' in response.headers.get('Content-Type', '').lower():
+            return response.url
+    except requests.RequestException as e:
+        print(f"Could not check export link {url}: {e}")
+    return None
+
+
+def from_export_link(page_url, html):
+    from bs4 import BeautifulSoup  # only needed once we have a page to parse
+
+    soup = BeautifulSoup(html, 'html.parser')
+    button = soup.find(id='customExport')
+    if button is None:
+        return None
+
+    candidates = [button.get(attr) for attr in URL_ATTRS]
+    candidates += URL_IN_JS.findall(button.get('onclick') or '')
+    form = button.find_parent('form')
+    if form is not None:
+        candidates.append(form.get('action'))
+
+    for candidate in candidates:
+        if candidate and not candidate.startswith(('#', 'javascript:')):
+            pdf_url = looks_like_pdf(urljoin(page_url, candidate))
+            if pdf_url:
+                return pdf_url
+    return None
+
+
+def from_embedded_pdf(page_url, html):
+    links = [urljoin(page_url, match) for match in PDF_IN_PAGE.findall(html)]
+    if not links:
+        return None
+    # leaguesecretary names the standings export ...standgNN.pdf
+    standings = [link for link in links if 'standg' in link.lower()]
+    return (standings or links)[0]
+
+
+HTTP_RESOLVERS = {
+    'export-link': from_export_link,
+    'embedded-pdf': from_embedded_pdf,
+}
+
+
+def remember_strategy(page_url, strategy):
+    def record(strategies):
+        strategies = strategies or {}
+        strategies[page_url] = strategy
+        return strategies
+    update_json(STRATEGIES_FILE, record, {})
+
+
+def strategy_order(remembered):
+    order = list(HTTP_STRATEGIES)
+    if remembered in order:
+        order.remove(remembered)
+        order.insert(0, remembered)
+    return order + ['browser']
+
+
+def resolve_pdf_url(page_url, browser_fallback):
+    remembered = (load_json(STRATEGIES_FILE, {}) or {}).get(page_url)
+    html = None
+    page_failed = False
+    for strategy in strategy_order(remembered):
+        if page_failed and strategy != 'browser':
+            continue  # needs the page we just failed to fetch
+        start = time.perf_counter()
+        try:
+            if strategy == 'browser':
+                pdf_url = browser_fallback()
+            else:
+                if html is None:
+                    try:
+                        html = fetch_page(page_url)
+                    except Exception:
+                        page_failed = True
+                        raise
+                pdf_url = HTTP_RESOLVERS[strategy](page_url, html)
+        except Exception as e:
+            print(f"Resolver '{strategy}' failed: {e}")
+            continue
+        if pdf_url:
+            shown = getattr(pdf_url, 'source_url', pdf_url)
+            print(f"Resolved PDF URL via {strategy} in {time.perf_counter() - start:.2f}s: {shown}")
+            if strategy != remembered and strategy != 'browser':
+                remember_strategy(page_url, strategy)
+            return pdf_url
+        print(f"Resolver '{strategy}' found no PDF link.")
+    raise Exception("Could not resolve the PDF URL with any strategy.")
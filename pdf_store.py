@@ -0,0 +1,106 @@
+import hashlib
+import os
+import shutil
+import tempfile
+
+# ============================================================
+# Streaming PDF Storage
+# ============================================================
+# Downloads are written to disk in chunks as they arrive and
+# hashed on the way through, so memory use stays flat however
+# big the PDF is and each byte is only read once. The file lands
+# under a temp name; callers move it to its real name once they
+# know it's worth keeping (rename is atomic, so nobody ever sees
+# a half-written standings_<date>.pdf).
+#
+# MAX_PDF_MB caps how much we'll accept, and a body shorter than
+# its Content-Length is treated as a failed download.
+# ============================================================
+
+MAX_PDF_BYTES = int(float(os.getenv('MAX_PDF_MB', 50)) * 1024 * 1024)
+CHUNK_SIZE = 64 * 1024
+
+
+class StoredPDF:
+    def __init__(self, path, sha256, size, source_url):
+        self.path = path
+        self.sha256 = sha256
+        self.size = size
+        self.source_url = source_url
+
+    def move_to(self, dest_path):
+        os.replace(self.path, dest_path)
+        self.path = dest_path
+
+    def link_to(self, dest_path):
+        # Give the same bytes a second name without copying them if we can
+        tmp_path = f'{dest_path}.tmp'
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        try:
+            os.link(self.path, tmp_path)
+        except OSError:
+            shutil.copyfile(self.path, tmp_path)
+        os.replace(tmp_path, dest_path)
+        return StoredPDF(dest_path, self.sha256, self.size, self.source_url)
+
+    def discard(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def stream_to_file(response, directory, max_bytes=MAX_PDF_BYTES, dest_path=None):
+    # `response` must come from requests with stream=True. Without a
+    # dest_path the file is left under a temp name in `directory`.
+    expected = response.headers.get('Content-Length')
+    expected = int(expected) if expected and expected.isdigit() else None
+    if expected is not None and expected > max_bytes:
+        raise Exception(f"PDF is {expected} bytes, over the {max_bytes} byte limit.")
+
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.download-', suffix='.pdf')
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            for chunk in response.iter_content(CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise Exception(f"PDF exceeded the {max_bytes} byte limit, aborting download.")
+                digest.update(chunk)
+                f.write(chunk)
+
+        # Content-Length counts bytes on the wire, which only matches what
+        # we wrote when the body wasn't compressed in transit
+        received = size
+        if response.headers.get('Content-Encoding', 'identity') != 'identity':
+            received = response.raw.tell()
+        if expected is not None and received != expected:
+            raise OSError(f"Truncated download: got {received} of {expected} bytes.")
+        if size == 0:
+            raise Exception("Downloaded PDF is empty.")
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+    stored = StoredPDF(tmp_path, digest.hexdigest(), size, response.url)
+    if dest_path:
+        stored.move_to(dest_path)
+    return stored
+
+
+def store_bytes(data, directory, source_url, max_bytes=MAX_PDF_BYTES):
+    # For bodies that arrive whole (e.g. captured from the browser)
+    if len(data) > max_bytes:
+        raise Exception(f"PDF is {len(data)} bytes, over the {max_bytes} byte limit.")
+    if not data:
+        raise Exception("Captured PDF is empty.")
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.download-', suffix='.pdf')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    return StoredPDF(tmp_path, hashlib.sha256(data).hexdigest(), len(data), source_url)
@@ -0,0 +1,380 @@
+import hashlib
+import mimetypes
+import os
+import posixpath
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from ftplib import error_perm
+
+from archive import put_atomic
+from ftp_pool import connection_lost, get_pool
+from pdf_store import CHUNK_SIZE
+from retry import FTP_RETRY, RetryPolicy, register_rule
+
+# ============================================================
+# Publish Targets
+# ============================================================
+# Where new PDFs (and their pointers and manifest, see archive.py
+# and manifest.py) get published. PUBLISH_TARGETS is a comma-
+# separated list; the first one is the primary:
+#
+#   ftp                    the FTP_HOST account (ftp_pool.py)
+#   dir:/srv/www/bowling   a local directory or mounted share
+#   s3://bucket/prefix     S3 or anything that speaks it (MinIO,
+#                          R2, ...; set S3_ENDPOINT_URL). Needs
+#                          boto3, which is only imported if used.
+#
+# The primary is what change detection reads and what the email
+# links to. Every other target is a mirror: it gets the same
+# files in the background, in parallel, each with its own retries
+# and size/hash checks, so a slow or broken mirror never holds up
+# the primary, the other mirrors, or the email. Before exiting, a
+# run gives mirrors up to MIRROR_WAIT seconds to finish; a mirror
+# that's still failing (or still going) is retried by the next
+# run (see journal.py).
+#
+# Retries happen at one level only: a target's publish_retry is
+# how often a whole publish job is tried, and check_retry how
+# often reading what's published (change detection) is. Both are
+# PUBLISH_RETRY, except on FTP: there every command retries (and
+# reconnects) on its own under FTP_RETRY, put_atomic() included.
+#
+# Every target hands out sessions with the same few operations,
+# on paths relative to the target's root:
+#
+#     with target.session() as session:
+#         session.size(path)             None if missing
+#         session.stamp(path)            cheap "has it changed?" token
+#         session.read(path, sink)       False if missing
+#         session.write(path, fileobj, sha256=None)
+#                                        atomic: all or nothing; with
+#                                        sha256, raises OSError rather
+#                                        than put other bytes in place
+#         session.delete(path)           fine if it's already gone
+# ============================================================
+
+PUBLISH_TARGETS = os.getenv('PUBLISH_TARGETS', 'ftp')
+PUBLISH_WORKERS = int(os.getenv('PUBLISH_WORKERS', 4))
+MIRROR_WAIT = float(os.getenv('MIRROR_WAIT', 300))  # seconds a run waits for mirrors before exiting
+S3_ENDPOINT_URL = os.getenv('S3_ENDPOINT_URL')
+
+# One try of a whole publish job; a failed check counts as an OSError,
+# so it's retried like a truncated transfer
+PUBLISH_RETRY = RetryPolicy('Publish', attempts=3, base=2, cap=30, max_elapsed=300)
+SINGLE_SHOT = RetryPolicy('Publish', attempts=1)
+
+
+def _mismatch(name, path, what, expected, actual):
+    raise OSError(f"{name}: {path} failed verification ({what} {actual}, expected {expected})")
+
+
+class FTPSession:
+    # Every operation retries under FTP_RETRY, reconnecting if the
+    # server hung up, so one 421 or timeout doesn't fail a publish
+    def __init__(self, ftp):
+        self.ftp = ftp
+
+    def _retry(self, fn, what):
+        def reconnect(error):
+            if connection_lost(error):
+                self.ftp.revive()
+        return FTP_RETRY.call(fn, on_retry=reconnect, what=f"FTP {what}")
+
+    def _enter(self, path, create=False):
+        # Move into the file's folder; returns its bare name
+        directory, name = posixpath.split(path)
+        if create:
+            self.ftp.ensure_directory(directory)
+        else:
+            self.ftp.cd(directory)
+        return name
+
+    def size(self, path):
+        def attempt():
+            try:
+                name = self._enter(path)
+                self.ftp.voidcmd('TYPE I')  # some servers refuse SIZE in ASCII mode
+                return self.ftp.size(name)
+            except error_perm:
+                return None
+        return self._retry(attempt, f"SIZE of {path}")
+
+    def stamp(self, path):
+        def attempt():
+            try:
+                name = self._enter(path)
+                self.ftp.voidcmd('TYPE I')
+                return [self.ftp.size(name), self.ftp.sendcmd(f'MDTM {name}').split()[-1]]
+            except error_perm:
+                return None
+        return self._retry(attempt, f"stamp of {path}")
+
+    def read(self, path, sink):
+        # A retry carries on where the broken transfer stopped, so `sink`
+        # never sees a byte twice
+        received = [0]
+
+        def counted(chunk):
+            received[0] += len(chunk)
+            sink(chunk)
+
+        def attempt():
+            if received[0] and not self.ftp.has_feature('REST'):
+                raise RuntimeError(f"{path}: download broke off and the server can't resume it")
+            try:
+                self.ftp.retrbinary(f'RETR {self._enter(path)}', counted, rest=received[0] or None)
+                return True
+            except error_perm:
+                if received[0]:
+                    raise
+                return False
+        return self._retry(attempt, f"download of {path}")
+
+    def write(self, path, fileobj, sha256=None):
+        name = self._retry(lambda: self._enter(path, create=True), f"folder for {path}")
+        put_atomic(self.ftp, name, fileobj, sha256)
+
+    def delete(self, path):
+        def attempt():
+            try:
+                self.ftp.delete(self._enter(path))
+            except error_perm:
+                pass
+        self._retry(attempt, f"delete of {path}")
+
+
+class FTPTarget:
+    name = 'ftp'
+    # Its sessions retry every command under FTP_RETRY, so a whole
+    # job isn't retried on top of that: the attempts would multiply
+    publish_retry = check_retry = SINGLE_SHOT
+
+    @contextmanager
+    def session(self):
+        with get_pool().session() as ftp:
+            yield FTPSession(ftp)
+
+
+class DirectoryTarget:
+    # Also its own session: there's nothing to connect to
+    publish_retry = check_retry = PUBLISH_RETRY
+
+    def __init__(self, root):
+        self.root = root
+        self.name = f'dir:{root}'
+
+    @contextmanager
+    def session(self):
+        yield self
+
+    def _path(self, path):
+        return os.path.join(self.root, *path.split('/'))
+
+    def size(self, path):
+        try:
+            return os.path.getsize(self._path(path))
+        except OSError:
+            return None
+
+    def stamp(self, path):
+        try:
+            stat = os.stat(self._path(path))
+        except OSError:
+            return None
+        return [stat.st_size, stat.st_mtime_ns]
+
+    def read(self, path, sink):
+        try:
+            with open(self._path(path), 'rb') as f:
+                for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                    sink(chunk)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def write(self, path, fileobj, sha256=None):
+        # Hashed on the way to the temp file; only a match is renamed in
+        full_path = self._path(path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        part = os.path.join(os.path.dirname(full_path), f'.{os.path.basename(full_path)}.part')
+        digest = hashlib.sha256()
+        with open(part, 'wb') as f:
+            for chunk in iter(lambda: fileobj.read(CHUNK_SIZE), b''):
+                digest.update(chunk)
+                f.write(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+        if sha256 is not None and digest.hexdigest() != sha256:
+            os.remove(part)
+            _mismatch(self.name, path, 'sha256', sha256, digest.hexdigest())
+        os.replace(part, full_path)
+
+    def delete(self, path):
+        try:
+            os.remove(self._path(path))
+        except FileNotFoundError:
+            pass
+
+
+class S3Target:
+    # S3 PUTs are atomic already, so no temp name is needed
+    publish_retry = check_retry = PUBLISH_RETRY
+
+    def __init__(self, bucket, prefix=''):
+        self.bucket = bucket
+        self.prefix = prefix.strip('/')
+        self.name = f's3://{bucket}/{self.prefix}'.rstrip('/')
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        with self._lock:
+            if self._client is None:
+                import boto3
+                import botocore.exceptions
+
+                register_rule((botocore.exceptions.EndpointConnectionError, botocore.exceptions.ConnectionClosedError,
+                               botocore.exceptions.ReadTimeoutError), True)
+                register_rule(botocore.exceptions.ClientError, _s3_error_retryable)
+                self._client = boto3.client('s3', endpoint_url=S3_ENDPOINT_URL or None)
+            return self._client
+
+    @contextmanager
+    def session(self):
+        yield self
+
+    def _key(self, path):
+        return posixpath.join(self.prefix, path) if self.prefix else path
+
+    def _head(self, path):
+        import botocore.exceptions
+
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=self._key(path))
+        except botocore.exceptions.ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return None
+            raise
+
+    def size(self, path):
+        head = self._head(path)
+        return head['ContentLength'] if head else None
+
+    def stamp(self, path):
+        head = self._head(path)
+        return [head['ContentLength'], head['ETag']] if head else None
+
+    def read(self, path, sink):
+        import botocore.exceptions
+
+        try:
+            body = self.client.get_object(Bucket=self.bucket, Key=self._key(path))['Body']
+        except botocore.exceptions.ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return False
+            raise
+        for chunk in body.iter_chunks(CHUNK_SIZE):
+            sink(chunk)
+        return True
+
+    def write(self, path, fileobj, sha256=None):
+        # Checked before the PUT, which then either lands whole or not at all
+        extra = {'ContentType': mimetypes.guess_type(path)[0] or 'application/octet-stream'}
+        if sha256 is not None:
+            digest = hashlib.sha256()
+            start = fileobj.tell()
+            for chunk in iter(lambda: fileobj.read(CHUNK_SIZE), b''):
+                digest.update(chunk)
+            fileobj.seek(start)
+            if digest.hexdigest() != sha256:
+                _mismatch(self.name, path, 'sha256', sha256, digest.hexdigest())
+            extra['Metadata'] = {'sha256': sha256}
+        self.client.upload_fileobj(fileobj, self.bucket, self._key(path), ExtraArgs=extra)
+
+    def delete(self, path):
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(path))
+
+
+def _s3_error_retryable(error):
+    status = error.response.get('ResponseMetadata', {}).get('HTTPStatusCode')
+    return status is None or status in (408, 429) or status >= 500
+
+
+def parse_target(spec):
+    spec = spec.strip()
+    if spec == 'ftp':
+        return FTPTarget()
+    if spec.startswith('dir:'):
+        return DirectoryTarget(spec[len('dir:'):])
+    if spec.startswith('s3://'):
+        bucket, _, prefix = spec[len('s3://'):].partition('/')
+        if bucket:
+            return S3Target(bucket, prefix)
+    raise ValueError(f"Unknown publish target '{spec}' (want ftp, dir:<path> or s3://<bucket>/<prefix>)")
+
+
+TARGETS = [parse_target(spec) for spec in PUBLISH_TARGETS.split(',') if spec.strip()]
+if not TARGETS:
+    raise ValueError("PUBLISH_TARGETS is empty")
+
+
+def primary():
+    return TARGETS[0]
+
+
+def mirrors():
+    return TARGETS[1:]
+
+
+_executor = None
+_executor_lock = threading.Lock()
+_running = set()  # (league id, target name) with a mirror job in flight
+_futures = []
+
+
+def in_background(key, fn, *args):
+    # Run a mirror job off the league's thread; None if it's already running
+    global _executor
+    with _executor_lock:
+        if key in _running:
+            return None
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=PUBLISH_WORKERS, thread_name_prefix='publish')
+        _running.add(key)
+    # Keep run_all_scrapers.py's per-league log prefix on the job's output
+    local = getattr(sys.stdout, 'local', None)
+    label = getattr(local, 'label', None)
+
+    def run():
+        if label:
+            local.label = label
+        try:
+            return fn(*args)
+        finally:
+            with _executor_lock:
+                _running.discard(key)
+    future = _executor.submit(run)
+    with _executor_lock:
+        _futures[:] = [pending for pending in _futures if not pending.done()] + [future]
+    return future
+
+
+def in_flight(league_id):
+    # Is a mirror job for this league still running?
+    with _executor_lock:
+        return any(key[0] == league_id for key in _running)
+
+
+def wait_for_mirrors(timeout=None):
+    # Give in-flight mirror jobs a chance to finish (e.g. before exiting);
+    # returns how many are still running
+    with _executor_lock:
+        pending = list(_futures)
+    if not pending:
+        return 0
+    print(f"Waiting for {len(pending)} mirror upload(s)...")
+    _, still_running = wait(pending, timeout=timeout)
+    return len(still_running)
@@ -0,0 +1,140 @@
+import os
+import random
+import smtplib
+import threading
+import time
+from ftplib import error_perm, error_temp, error_reply
+
+import requests
+
+import metrics
+
+# ============================================================
+# Retries, Backoff and the Run Deadline
+# ============================================================
+# One way of retrying for everything that talks to the outside
+# world (HTTP, FTP, SMTP):
+#
+#     HTTP_RETRY.call(fetch, url, what="Download")
+#
+# - Waits between attempts grow exponentially with full jitter,
+#   so a flaky server isn't hit by every league in lockstep.
+# - Whether an error is worth retrying depends on what it is
+#   (RULES below): timeouts, dropped connections, 5xx/429 and
+#   FTP/SMTP 4xx replies are; bad logins, 404s and other
+#   permanent refusals fail straight away.
+# - The whole run has a deadline (RUN_DEADLINE_SECONDS, kept
+#   under the workflow's 15 minute kill). No retry sleeps past
+#   it, and each policy also caps how long a single call may
+#   spend retrying, so one league's slow failures can't use up
+#   the time the others need.
+# ============================================================
+
+RUN_DEADLINE_SECONDS = float(os.getenv('RUN_DEADLINE_SECONDS', 780))
+
+_deadline = time.monotonic() + RUN_DEADLINE_SECONDS
+
+
+def start_run(seconds=RUN_DEADLINE_SECONDS):
+    # Restart the deadline clock (the process start counts as the first run)
+    global _deadline
+    _deadline = time.monotonic() + seconds
+
+
+def remaining():
+    return _deadline - time.monotonic()
+
+
+def clip(timeout, floor=1):
+    # A socket timeout that doesn't run (much) past the deadline
+    return max(floor, min(timeout, remaining()))
+
+
+def _http_status_retryable(error):
+    status = error.response.status_code if error.response is not None else None
+    return status is None or status in (408, 429) or status >= 500
+
+
+def _smtp_code_retryable(error):
+    return 400 <= error.smtp_code < 500
+
+
+# First match wins: (error types, retry?) where retry? may be a function
+# of the error. Order matters — requests' errors are also OSErrors.
+RULES = [
+    (smtplib.SMTPAuthenticationError, False),
+    ((smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused), False),
+    (smtplib.SMTPResponseException, _smtp_code_retryable),
+    (smtplib.SMTPServerDisconnected, True),
+    (requests.HTTPError, _http_status_retryable),
+    ((requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError), True),
+    (requests.RequestException, False),
+    (error_perm, False),
+    ((error_temp, error_reply, EOFError), True),
+    (OSError, True),  # timeouts, resets, truncated downloads
+]
+
+_rules_lock = threading.Lock()
+
+
+def register_rule(types, decision):
+    # Teach is_retryable() about an optional library's errors (e.g.
+    # botocore's, for S3 targets) once it's actually imported. These go
+    # ahead of the built-in rules; registering the same rule twice is a
+    # no-op. RULES is replaced rather than changed in place, so a check
+    # running in another thread always sees a whole list.
+    global RULES
+    with _rules_lock:
+        if (types, decision) not in RULES:
+            RULES = [(types, decision)] + RULES
+
+
+def is_retryable(error):
+    for types, decision in RULES:
+        if isinstance(error, types):
+            return decision(error) if callable(decision) else decision
+    return False
+
+
+class RetryPolicy:
+    def __init__(self, name, attempts=3, base=1.0, cap=30.0, max_elapsed=None):
+        self.name = name
+        self.attempts = attempts
+        self.base = base
+        self.cap = cap
+        self.max_elapsed = max_elapsed  # seconds one call may spend retrying
+
+    def backoff(self, attempt):
+        return random.uniform(0, min(self.cap, self.base * 2 ** attempt))
+
+    def call(self, fn, *args, on_retry=None, what=None, **kwargs):
+        # on_retry(error) runs before each new attempt, e.g. to reconnect
+        what = what or self.name
+        start = time.monotonic()
+        for attempt in range(1, self.attempts + 1):
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                error = e
+                if not is_retryable(e) or attempt == self.attempts:
+                    raise
+                delay = self.backoff(attempt - 1)
+                budget = remaining()
+                if self.max_elapsed is not None:
+                    budget = min(budget, self.max_elapsed - (time.monotonic() - start))
+                if delay >= budget:
+                    print(f"{what} attempt {attempt} failed: {e} (out of time, not retrying)")
+                    raise
+                print(f"{what} attempt {attempt} failed: {e} (retrying in {delay:.1f}s)")
+                metrics.current().add('retries')
+            time.sleep(delay)
+            if on_retry is not None:
+                try:
+                    on_retry(error)
+                except Exception as hook_error:
+                    print(f"{what}: couldn't recover before retrying: {hook_error}")
+
+
+HTTP_RETRY = RetryPolicy('HTTP', attempts=4, base=1, cap=15, max_elapsed=60)
+FTP_RETRY = RetryPolicy('FTP', attempts=4, base=2, cap=20, max_elapsed=120)
+SMTP_RETRY = RetryPolicy('SMTP', attempts=int(os.getenv('SMTP_RETRIES', 3)), base=2, cap=30, max_elapsed=90)
@@ -1,48 +1,320 @@
-import subprocess
+import os
+import signal
 import sys
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import metrics
+import retry
+from browser_pool import BrowserPool
+from concurrency import MAX_BROWSERS
+from engine import load_leagues, run_league, LEAGUES_FILE
+from ftp_pool import get_pool
+from notifier import Notifier
+from publishers import MIRROR_WAIT, wait_for_mirrors
+from scheduler import Scheduler
 
 # ============================================================
 # Run All Bowling League Scrapers
 # ============================================================
-# Each scraper runs independently — if one fails, the others
+# Each league runs independently — if one fails, the others
 # still get their shot. A summary prints at the end showing
 # which ones passed and which ones struck out. (pun intended)
+#
+# Every enabled league in leagues.toml runs through engine.py in
+# this one process, at the same time on a thread pool (up to
+# MAX_JOBS at once), so a run takes about as long as the slowest
+# league instead of all of them added up. They share one
+# headless Chrome (see browser_pool.py), and concurrency.py caps
+# how many browser/HTTP/FTP jobs hit the outside world at once.
+#
+# JOB_TIMEOUT (seconds) is how long any one league gets before
+# it's marked as failed — the workflow itself is killed at 15
+# minutes, so this keeps one stuck league from eating the rest.
+#
+# Where each league's time went (resolve, download, compare,
+# publish, ...) is printed under its line in the summary, and
+# written to state/metrics as JSON lines and a Prometheus
+# textfile (see metrics.py).
+#
+# python run_all_scrapers.py --daemon stays running instead (the
+# Docker image does this): scheduler.py decides when each league
+# is next checked (often on the nights it usually posts, rarely
+# otherwise), and Chrome, the HTTP sessions and the FTP
+# connections stay warm between rounds. SIGHUP reloads
+# leagues.toml; SIGTERM/Ctrl-C finishes the current round, closes
+# everything and exits (a second one exits right away).
 # ============================================================
 
-scrapers = [
-    "scraper_weds-mixers.py",
-    "scraper_roto-rooters-trios.py",
-    "scraper_mag-7-high-performance.py",
-]
+JOB_TIMEOUT = float(os.getenv('JOB_TIMEOUT', 600))
+MAX_JOBS = int(os.getenv('MAX_JOBS', 16))
+
+
+class PrefixedOutput:
+    # Leagues print at the same time now, so tag every line with the
+    # scraper that printed it to keep the logs readable
+    def __init__(self, stream):
+        self.stream = stream
+        self.local = threading.local()
+        self.lock = threading.Lock()
+
+    def write(self, text):
+        label = getattr(self.local, 'label', None)
+        if label:
+            pending = getattr(self.local, 'pending', '') + text
+            *lines, self.local.pending = pending.split('\n')
+            text = ''.join(f"[{label}] {line}\n" for line in lines)
+        with self.lock:
+            self.stream.write(text)
+        return len(text)
+
+    def flush(self):
+        self.stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+def load_enabled():
+    return [league for league in load_leagues() if league.enabled]
+
+
+class Round:
+    # One pass over a set of leagues, run side by side
+    def __init__(self, leagues, pool, notifier):
+        self.leagues = leagues
+        self.pool = pool
+        self.notifier = notifier
+        self.results = {}
+        self.timings = {}
+        self.outcomes = {}  # league id -> what run_league did ('published', ...)
+        self.started = {}
+        self.timed_out = False
+        self.stuck = {}  # league id -> future still running after its timeout
+
+    def run_job(self, league):
+        output.local.label = league.id
+        self.started[league.id] = time.perf_counter()
+        try:
+            self.outcomes[league.id] = run_league(league, pool=self.pool, notifier=self.notifier)
+        finally:
+            self.timings[league.id] = time.perf_counter() - self.started[league.id]
+            if getattr(output.local, 'pending', ''):
+                print()
 
-results = {}
+    def run(self):
+        executor = ThreadPoolExecutor(max_workers=max(1, min(MAX_JOBS, len(self.leagues))))
+        futures = {}
+        for league in self.leagues:
+            print(f"  Starting: {league.id}")
+            futures[executor.submit(self.run_job, league)] = league.id
 
-for scraper in scrapers:
+        # Wait for the leagues to finish, giving up on any that have been
+        # running for longer than JOB_TIMEOUT
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=1, return_when=FIRST_COMPLETED)
+            for future in done:
+                league_id = futures[future]
+                try:
+                    future.result()
+                    self.results[league_id] = "✓ Success"
+                except Exception as e:
+                    print(f"\n{league_id} failed:")
+                    traceback.print_exception(e)
+                    self.results[league_id] = f"✗ Error: {e}"
+            now = time.perf_counter()
+            for future in list(pending):
+                league_id = futures[future]
+                if league_id in self.started and now - self.started[league_id] > JOB_TIMEOUT:
+                    self.timed_out = True
+                    pending.discard(future)
+                    self.stuck[league_id] = future
+                    self.timings[league_id] = JOB_TIMEOUT
+                    self.results[league_id] = f"✗ Timed out after {JOB_TIMEOUT:.0f}s"
+
+        executor.shutdown(wait=not self.timed_out, cancel_futures=True)
+
+    def succeeded(self, league):
+        return self.results.get(league.id, '').startswith("✓")
+
+
+def send_notifications(notifier):
+    # Every league that changed queued an email; send them all over one
+    # SMTP connection (anything that fails stays in the outbox for next run)
+    print()
+    sent_before = notifier.sent
+    try:
+        unsent = notifier.flush()
+        if unsent:
+            return f"✗ {unsent} notification(s) not sent (kept in outbox)"
+        return f"✓ Notifications sent: {notifier.sent - sent_before}"
+    except Exception as e:
+        traceback.print_exc()
+        return f"✗ Notifications failed: {e}"
+
+
+def print_summary(round_, notify_status, launches, logins, run_start):
+    breakdown = metrics.breakdown()
     print(f"\n{'='*60}")
-    print(f"  Running: {scraper}")
+    print("  SCRAPER SUMMARY")
+    print(f"{'='*60}")
+    for league in round_.leagues:
+        status = round_.results[league.id]
+        timing = f"  ({round_.timings[league.id]:.1f}s)" if league.id in round_.timings else ""
+        print(f"  {status}  —  {league.id}{timing}")
+        stages = breakdown.get(league.id, {})
+        steps = [f"{name} {seconds:.1f}s" for name, seconds in stages.items()]
+        if steps:
+            print(f"      {' · '.join(steps)}")
+    print(f"  {notify_status}")
+    print(f"{'='*60}")
+    print(f"  Browser launches: {len(launches)}  ({sum(launches):.1f}s)")
+    print(f"  FTP logins:       {logins}")
+    print(f"  Total run time:   {time.perf_counter() - run_start:.1f}s")
     print(f"{'='*60}\n")
+
+    # Any failure counts (so GitHub Actions marks the run as failed)
+    return any("✗" in status for status in list(round_.results.values()) + [notify_status])
+
+
+def run_once():
     try:
-        subprocess.run([sys.executable, scraper], check=True)
-        results[scraper] = "✓ Success"
-    except subprocess.CalledProcessError as e:
-        results[scraper] = f"✗ Failed (exit code {e.returncode})"
+        leagues = load_enabled()
     except Exception as e:
-        results[scraper] = f"✗ Error: {e}"
-
-# Print summary
-print(f"\n{'='*60}")
-print("  SCRAPER SUMMARY")
-print(f"{'='*60}")
-for scraper, status in results.items():
-    print(f"  {status}  —  {scraper}")
-print(f"{'='*60}\n")
-
-# Exit with error code if ANY scraper failed
-# (so GitHub Actions marks the run as failed and you can see it)
-failed = any("✗" in status for status in results.values())
-if failed:
-    print("One or more scrapers failed. Check logs above for details.")
-    sys.exit(1)
-else:
-    print("All scrapers completed successfully. Strike!")
-    sys.exit(0)
+        print(f"Could not load {LEAGUES_FILE}: {e}")
+        return 1
+
+    run_start = time.perf_counter()
+    pool = BrowserPool(size=MAX_BROWSERS)
+    notifier = Notifier()
+    round_ = Round(leagues, pool, notifier)
+    round_.run()
+    pool.shutdown(force=round_.timed_out)
+
+    notify_status = send_notifications(notifier)
+    # Mirrors keep going in the background while the emails go out; don't
+    # wait for them past the run deadline (the workflow still has to save
+    # state/ before its timeout kills the job)
+    mirrors_left = wait_for_mirrors(min(MIRROR_WAIT, max(0, retry.remaining())))
+    if mirrors_left:
+        print("Some mirror uploads are still running; the next run will finish them.")
+    ftp_pool = get_pool()
+    ftp_pool.close()
+    metrics.export()
+    failed = print_summary(round_, notify_status, pool.launches, ftp_pool.logins, run_start)
+
+    # Exit with error code if ANY scraper failed
+    # (so GitHub Actions marks the run as failed and you can see it)
+    if failed:
+        print("One or more scrapers failed. Check logs above for details.")
+        exit_code = 1
+    else:
+        print("All scrapers completed successfully. Strike!")
+        exit_code = 0
+
+    sys.stdout.flush()
+    if round_.timed_out or mirrors_left:
+        # A timed-out league's thread can't be killed, and an unfinished
+        # mirror upload would be waited for; either would keep the
+        # interpreter alive on exit, so leave without waiting for them
+        os._exit(exit_code)
+    return exit_code
+
+
+def run_daemon():
+    stop = threading.Event()
+    reload = threading.Event()
+    wake = threading.Event()
+
+    def on_stop(signum, frame):
+        if stop.is_set():
+            print("Second stop signal, exiting now.")
+            sys.stdout.flush()
+            os._exit(1)
+        print(f"Got {signal.Signals(signum).name}, stopping after this round...")
+        stop.set()
+        wake.set()
+
+    def on_reload(signum, frame):
+        reload.set()
+        wake.set()
+
+    signal.signal(signal.SIGTERM, on_stop)
+    signal.signal(signal.SIGINT, on_stop)
+    if hasattr(signal, 'SIGHUP'):
+        signal.signal(signal.SIGHUP, on_reload)
+
+    try:
+        leagues = load_enabled()
+    except Exception as e:
+        print(f"Could not load {LEAGUES_FILE}: {e}")
+        return 1
+
+    scheduler = Scheduler()
+    pool = BrowserPool(size=MAX_BROWSERS)
+    notifier = Notifier()
+    ftp_pool = get_pool()
+    stuck = {}
+    print(f"Watching {len(leagues)} league(s):")
+    for league in leagues:
+        print(f"  {league.id}: {scheduler.describe(league)}")
+
+    try:
+        while not stop.is_set():
+            wake.clear()
+            if reload.is_set():
+                reload.clear()
+                try:
+                    leagues = load_enabled()
+                    scheduler.forget(leagues)
+                    print(f"Reloaded {LEAGUES_FILE}: {len(leagues)} league(s).")
+                except Exception as e:
+                    print(f"Could not reload {LEAGUES_FILE}, keeping the old list: {e}")
+
+            # A league whose last run blew its timeout sits out until it ends
+            stuck = {league_id: future for league_id, future in stuck.items() if not future.done()}
+            due = [league for league in scheduler.due(leagues) if league.id not in stuck]
+            if due:
+                run_start = time.perf_counter()
+                retry.start_run()
+                metrics.new_run()
+                launches, logins = len(pool.launches), ftp_pool.logins
+                round_ = Round(due, pool, notifier)
+                round_.run()
+                for league in due:
+                    scheduler.ran(league, round_.succeeded(league), round_.outcomes.get(league.id) == 'published')
+                stuck.update(round_.stuck)
+                launched = pool.launches[launches:]
+                if round_.timed_out:
+                    # Quitting its browser is the only way to unstick it
+                    pool.shutdown(force=True)
+                    pool = BrowserPool(size=MAX_BROWSERS)
+                notify_status = send_notifications(notifier)
+                metrics.export()
+                print_summary(round_, notify_status, launched, ftp_pool.logins - logins, run_start)
+                sys.stdout.flush()
+
+            wake.wait(scheduler.seconds_until_next(leagues))
+    finally:
+        print("Shutting down...")
+        pool.shutdown(force=True)
+        wait_for_mirrors(MIRROR_WAIT)
+        ftp_pool.close()
+        metrics.export()
+    print("Stopped.")
+    return 0
+
+
+output = PrefixedOutput(sys.stdout)
+
+if __name__ == '__main__':
+    sys.stdout = output
+    if '--daemon' in sys.argv[1:]:
+        code = run_daemon()
+    else:
+        code = run_once()
+    sys.stdout.flush()
+    sys.exit(code)
@@ -0,0 +1,188 @@
+import os
+import re
+import time
+from datetime import datetime, timedelta, timezone
+
+from state import state_path, load_json, update_json
+
+# ============================================================
+# Poll Scheduler (daemon mode)
+# ============================================================
+# Leagues bowl on set nights, so their standings show up at
+# predictable times. Rather than checking everyone every few
+# minutes all week, each league gets its own schedule:
+#
+#   - "hot" hours: every DENSE_INTERVAL (default 5 minutes)
+#   - the rest of the week: every SPARSE_INTERVAL (default 6
+#     hours), but never sleeping past the start of a hot window
+#
+# Hot hours are learned from when the league's standings actually
+# changed (history.py) over the last LEARN_WEEKS weeks: the hour
+# of the week each change was seen, from WINDOW_BEFORE hours
+# before it to WINDOW_AFTER hours after. Until a league has
+# MIN_CHANGES changes on record it's checked every POLL_INTERVAL.
+#
+# leagues.toml can override this per league:
+#
+#   poll_interval = 900                      # fixed, no learning
+#   poll_windows = ["Wed 20:00-Thu 02:00"]   # hot hours by hand
+#
+# Windows and learned hours use SCHEDULE_TZ. A league that
+# fails is retried after RETRY_INTERVAL. When each league is next
+# due is kept in state/schedule.json, so a restart doesn't
+# re-check everything at once.
+# ============================================================
+
+POLL_INTERVAL = float(os.getenv('POLL_INTERVAL', 600))
+RETRY_INTERVAL = float(os.getenv('RETRY_INTERVAL', 120))
+DENSE_INTERVAL = float(os.getenv('DENSE_INTERVAL', 300))
+SPARSE_INTERVAL = float(os.getenv('SPARSE_INTERVAL', 6 * 3600))
+LEARN_WEEKS = int(os.getenv('LEARN_WEEKS', 8))
+MIN_CHANGES = int(os.getenv('MIN_CHANGES', 2))
+WINDOW_BEFORE = int(os.getenv('WINDOW_BEFORE', 1))
+WINDOW_AFTER = int(os.getenv('WINDOW_AFTER', 4))
+SCHEDULE_TZ = os.getenv('SCHEDULE_TZ', 'America/Chicago')
+
+SCHEDULE_FILE = state_path('schedule.json')
+
+DAYS = ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun']
+HOURS_PER_WEEK = 7 * 24
+WINDOW = re.compile(r'^\s*(\w{3})\w*\s+(\d{1,2}):(\d{2})\s*-\s*(?:(\w{3})\w*\s+)?(\d{1,2}):(\d{2})\s*$')
+
+
+def _timezone():
+    try:
+        from zoneinfo import ZoneInfo
+        return ZoneInfo(SCHEDULE_TZ)
+    except Exception:
+        print(f"Unknown SCHEDULE_TZ '{SCHEDULE_TZ}', using UTC.")
+        return timezone.utc
+
+
+TZ = _timezone()
+
+
+def hour_of_week(moment):
+    # 0 = Monday 00:00-00:59 in SCHEDULE_TZ
+    local = moment.astimezone(TZ)
+    return local.weekday() * 24 + local.hour
+
+
+def parse_window(text):
+    # "Wed 20:00-Thu 02:00" or "Wed 18:00-23:00" -> set of hours of the week
+    match = WINDOW.match(text)
+    if not match:
+        raise ValueError(f"Bad poll window '{text}' (want e.g. \"Wed 20:00-Thu 02:00\")")
+    start_day, start_hour, _, end_day, end_hour, end_minute = match.groups()
+    end_day = end_day or start_day
+    for day in (start_day, end_day):
+        if day.lower() not in DAYS:
+            raise ValueError(f"Bad day '{day}' in poll window '{text}'")
+    start = DAYS.index(start_day.lower()) * 24 + int(start_hour)
+    end = DAYS.index(end_day.lower()) * 24 + int(end_hour) + (1 if int(end_minute) else 0)
+    length = (end - start) % HOURS_PER_WEEK or HOURS_PER_WEEK
+    return {(start + offset) % HOURS_PER_WEEK for offset in range(length)}
+
+
+def parse_windows(windows):
+    hours = set()
+    for window in windows or []:
+        hours |= parse_window(window)
+    return hours
+
+
+def learn_hours(league_id):
+    # Hours of the week this league's standings tend to change in
+    from history import change_times
+
+    changes = change_times(league_id, days=LEARN_WEEKS * 7)
+    if len(changes) < MIN_CHANGES:
+        return None
+    hours = set()
+    for changed_at in changes:
+        seen = hour_of_week(changed_at)
+        for offset in range(-WINDOW_BEFORE, WINDOW_AFTER + 1):
+            hours.add((seen + offset) % HOURS_PER_WEEK)
+    return hours
+
+
+class Scheduler:
+    def __init__(self, interval=POLL_INTERVAL, retry_interval=RETRY_INTERVAL,
+                 dense_interval=DENSE_INTERVAL, sparse_interval=SPARSE_INTERVAL):
+        self.interval = interval
+        self.retry_interval = retry_interval
+        self.dense_interval = dense_interval
+        self.sparse_interval = sparse_interval
+        self._next = {
+            league_id: due for league_id, due in (load_json(SCHEDULE_FILE, {}) or {}).items()
+            if isinstance(due, (int, float))
+        }
+        self._hours = {}  # league id -> hot hours (None = not enough history)
+
+    def hot_hours(self, league):
+        if league.poll_windows:
+            return parse_windows(league.poll_windows)
+        if league.id not in self._hours:
+            try:
+                self._hours[league.id] = learn_hours(league.id)
+            except Exception as e:
+                print(f"Couldn't learn a schedule for {league.id}: {e}")
+                self._hours[league.id] = None
+        return self._hours[league.id]
+
+    def describe(self, league):
+        if league.poll_interval:
+            return f"every {league.poll_interval:.0f}s (fixed)"
+        hours = self.hot_hours(league)
+        if not hours:
+            return f"every {self.interval:.0f}s (still learning)"
+        return f"every {self.dense_interval:.0f}s for {len(hours)}h a week, else every {self.sparse_interval:.0f}s"
+
+    def next_check(self, league, now):
+        # When to look at this league again after a successful check at `now`
+        if league.poll_interval:
+            return now + league.poll_interval
+        hours = self.hot_hours(league)
+        if not hours:
+            return now + self.interval
+        moment = datetime.fromtimestamp(now, timezone.utc)
+        if hour_of_week(moment) in hours:
+            return now + self.dense_interval
+        # Sleep long, but wake up for the start of the next hot hour
+        latest = now + self.sparse_interval
+        boundary = moment.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+        while boundary.timestamp() < latest:
+            if hour_of_week(boundary) in hours:
+                return boundary.timestamp()
+            boundary += timedelta(hours=1)
+        return latest
+
+    def due(self, leagues, now=None):
+        now = time.time() if now is None else now
+        return [league for league in leagues if self._next.get(league.id, now) <= now]
+
+    def ran(self, league, succeeded, changed=False, now=None):
+        now = time.time() if now is None else now
+        if changed:
+            self._hours.pop(league.id, None)  # relearn with the new change
+        due = self.next_check(league, now) if succeeded else now + self.retry_interval
+        self._next[league.id] = due
+
+        def record(schedule):
+            schedule[league.id] = due
+            return schedule
+        update_json(SCHEDULE_FILE, record, {})
+
+    def forget(self, leagues):
+        # Called after a reload: drop leagues that left the registry, and
+        # recompute anything whose settings may have changed
+        known = {league.id for league in leagues}
+        for league_id in list(self._next):
+            if league_id not in known:
+                del self._next[league_id]
+        self._hours.clear()
+
+    def seconds_until_next(self, leagues, now=None):
+        now = time.time() if now is None else now
+        upcoming = [self._next.get(league.id, now) for league in leagues]
+        return max(0.0, min(upcoming) - now) if upcoming else self.interval
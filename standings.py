@@ -0,0 +1,137 @@
+import hashlib
+import json
+import os
+import re
+
+from state import state_path, load_json, save_json
+
+# ============================================================
+# Standings Extraction
+# ============================================================
+# leaguesecretary regenerates the export every time it's asked,
+# so two downloads of the same standings can differ in their
+# bytes (creation timestamps, document ids, "printed on" lines).
+# Comparing bytes alone would re-upload and re-email for nothing.
+#
+# Here we read the text out of the PDF and keep just the table
+# rows: a name followed by at least MIN_NUMBERS numbers (points
+# won/lost, averages, pins, ...). A digest of those rows is what
+# decides whether the standings really changed.
+#
+# Each distinct PDF is parsed once; the rows are cached in
+# state/extract/<sha256>.json. Since most regenerated exports
+# hash differently every time, the cache is kept to
+# EXTRACT_CACHE_MAX_ENTRIES files by dropping the least recently
+# used (a resumed publish reads its own entry back, so that one
+# stays fresh). pypdf is optional — without it (or if a PDF
+# can't be parsed) we fall back to comparing bytes.
+# ============================================================
+
+EXTRACT_DIR = state_path('extract')
+EXTRACTOR_VERSION = 1  # bump when the parsing changes so old results are redone
+MAX_ENTRIES = int(os.getenv('EXTRACT_CACHE_MAX_ENTRIES', 200))
+MIN_NUMBERS = 3
+
+NUMBER = re.compile(r'^[-+]?\d+(?:[.,]\d+)?%?$')
+NOISE = re.compile(r'\b(page \d+ of \d+|printed|created|generated|run date)\b|\d{1,2}:\d{2}', re.IGNORECASE)
+
+_warned = False
+
+
+def _cache_path(sha256):
+    return os.path.join(EXTRACT_DIR, f'{sha256}.json')
+
+
+def read_text(path):
+    from pypdf import PdfReader
+
+    reader = PdfReader(path)
+    return '\n'.join(page.extract_text() or '' for page in reader.pages)
+
+
+def parse_row(line):
+    # "1  3  Strike Force  63.0  49.0  512  ..." -> place, team, numbers
+    tokens = line.split()
+    numbers = []
+    while tokens and NUMBER.match(tokens[-1]):
+        numbers.insert(0, tokens.pop())
+    if len(numbers) < MIN_NUMBERS or not tokens:
+        return None
+    place = None
+    while tokens and tokens[0].isdigit():
+        place = place if place is not None else int(tokens[0])
+        tokens.pop(0)
+    if not tokens:
+        return None
+    return {'place': place, 'team': ' '.join(tokens), 'values': numbers}
+
+
+def parse_rows(text):
+    rows = []
+    for line in text.splitlines():
+        line = ' '.join(line.split())
+        if not line or NOISE.search(line):
+            continue
+        row = parse_row(line)
+        if row:
+            rows.append(row)
+    return rows
+
+
+def extract(stored):
+    # Standings rows for a StoredPDF, or None if we can't read them
+    global _warned
+    cached = load_json(_cache_path(stored.sha256))
+    if cached and cached.get('version') == EXTRACTOR_VERSION:
+        try:
+            os.utime(_cache_path(stored.sha256))  # mark as recently used for eviction
+        except OSError:
+            pass
+        return cached['rows']
+
+    try:
+        rows = parse_rows(read_text(stored.path))
+    except ImportError:
+        if not _warned:
+            print("pypdf not installed, comparing PDFs byte for byte.")
+            _warned = True
+        return None
+    except Exception as e:
+        print(f"Couldn't read standings out of the PDF: {e}")
+        return None
+
+    save_json(_cache_path(stored.sha256), {'version': EXTRACTOR_VERSION, 'sha256': stored.sha256, 'rows': rows})
+    evict()
+    print(f"Extracted {len(rows)} standings rows.")
+    return rows
+
+
+def evict(max_entries=MAX_ENTRIES):
+    # Drop the least recently used extractions beyond max_entries
+    try:
+        names = [name for name in os.listdir(EXTRACT_DIR) if name.endswith('.json')]
+    except FileNotFoundError:
+        return
+    if len(names) <= max_entries:
+        return
+    entries = []
+    for name in names:
+        path = os.path.join(EXTRACT_DIR, name)
+        try:
+            entries.append((os.stat(path).st_mtime, path))
+        except FileNotFoundError:
+            pass
+    for _, path in sorted(entries)[:max(0, len(entries) - max_entries)]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def standings_digest(rows):
+    # None when there's nothing to go on, so an unreadable PDF never
+    # counts as "unchanged"
+    if not rows:
+        return None
+    canonical = json.dumps(rows, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
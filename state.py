@@ -0,0 +1,53 @@
+import json
+import os
+import threading
+
+# ============================================================
+# Local State Files
+# ============================================================
+# Small JSON files the scrapers remember between runs live under
+# STATE_DIR. The GitHub workflow caches this directory after
+# every run, failed ones included, so a run picks up where the
+# last one left off (unsent emails, half-published leagues).
+# Elsewhere, keep it on persistent storage; the Docker image
+# declares it as a volume (/app/state), so mount a named one.
+# Writes go to a temp file first and are renamed into place, so a
+# crash never leaves a half-written file behind.
+# ============================================================
+
+STATE_DIR = os.getenv('STATE_DIR', 'state')
+
+_lock = threading.Lock()
+
+
+def state_path(*parts):
+    return os.path.join(STATE_DIR, *parts)
+
+
+def load_json(path, default=None):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable state file {path}: {e}")
+        return default
+
+
+def save_json(path, data):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def update_json(path, fn, default=None):
+    # Read-modify-write under a lock so concurrent leagues don't clobber
+    # each other's entries in a shared file
+    with _lock:
+        data = load_json(path, default)
+        data = fn(data)
+        save_json(path, data)
+        return data